@@ -0,0 +1,287 @@
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from contextlib import redirect_stdout
+
+import fixtures
+import htmljson
+import jsonword
+import mock_server
+import newap
+
+STAGES = ["parse", "json", "docx"]
+
+# Entry points whose import cost is tracked by --startup
+STARTUP_MODULES = ["pipeline", "work_queue", "metrics", "catalog", "htmljson", "newap", "jsonword"]
+HEAVY_DEPENDENCIES = ["requests", "bs4", "docx"]
+
+def run_stage(stage, context):
+    """
+    Run one pipeline stage on the fixture held in context and return its result
+    """
+    if stage == "parse":
+        context["surah_data"] = htmljson.extract_surah_data(context["html"], context["surah_id"])
+        return context["surah_data"]
+    if stage == "json":
+        with open(context["json_path"], "w", encoding="utf-8") as json_file:
+            json.dump(context["surah_data"], json_file, ensure_ascii=False, indent=2)
+        return context["json_path"]
+    if stage == "docx":
+        return jsonword.create_quran_word_document(context["json_path"], footnotes=context["footnotes"])
+    raise ValueError(f"Unknown stage: {stage}")
+
+def get_peak_rss():
+    """
+    Peak resident set size of this process in bytes. Linux's VmHWM comes
+    first: ru_maxrss survives fork and exec there, so a child of a large
+    benchmark process would start out at its parent's peak.
+    """
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+
+    # ru_maxrss is in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def run_stage_for_rss(stage, job):
+    """
+    Entry point of the fresh interpreter started by measure_peak_rss: load
+    the stage's inputs, run it once and print how far it raised the peak
+    resident set size, in bytes
+    """
+    context = json.loads(job)
+    with open(context["html_path"], "r", encoding="utf-8") as html_file:
+        context["html"] = html_file.read()
+    if stage != "parse":
+        with open(context["json_path"], "r", encoding="utf-8") as json_file:
+            context["surah_data"] = json.load(json_file)
+
+    before = get_peak_rss()
+    with redirect_stdout(io.StringIO()):
+        run_stage(stage, context)
+    print(get_peak_rss() - before)
+
+def measure_peak_rss(stage, context):
+    """
+    Run a stage once in a fresh interpreter and return the growth of its
+    peak RSS. Unlike tracemalloc this also counts what lxml and other C
+    code allocate, which is most of the DOCX stage's memory, and a fresh
+    process keeps earlier stages' high-water marks out of it. Unix only.
+    """
+    job = {key: context[key] for key in ("surah_id", "html_path", "json_path", "footnotes")}
+    completed = subprocess.run(
+        [sys.executable, "-c", "import sys, benchmark; benchmark.run_stage_for_rss(sys.argv[1], sys.argv[2])",
+         stage, json.dumps(job)],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True,
+    )
+    return int(completed.stdout.split()[-1])
+
+def measure_stage(stage, context, repeat):
+    """
+    Time a stage `repeat` times and return the best time with the stage's
+    peak RSS growth, measured in a separate run
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        # The stages print progress lines, keep them out of the report
+        with redirect_stdout(io.StringIO()):
+            run_stage(stage, context)
+        timings.append(time.perf_counter() - start)
+
+    return min(timings), measure_peak_rss(stage, context)
+
+def benchmark_size(verse_count, work_dir, repeat=3, notes_per_verse=1.2, footnotes=False):
+    """
+    Benchmark every stage on one synthetic surah of verse_count verses
+    """
+    surah_id = str(verse_count)
+    html = fixtures.generate_surah_html(surah_id, verse_count, notes_per_verse)
+
+    json_dir = os.path.join(work_dir, "json_files")
+    if not os.path.exists(json_dir):
+        os.makedirs(json_dir)
+
+    html_path = os.path.join(work_dir, f"surah_{surah_id}_html.txt")
+    with open(html_path, "w", encoding="utf-8") as html_file:
+        html_file.write(html)
+
+    context = {
+        "surah_id": surah_id,
+        "html": html,
+        "html_path": html_path,
+        "json_path": os.path.join(json_dir, f"surah_{surah_id}.json"),
+        "footnotes": footnotes,
+    }
+    html_bytes = len(html.encode("utf-8"))
+
+    results = []
+    for stage in STAGES:
+        seconds, peak = measure_stage(stage, context, repeat)
+        note_count = sum(len(v["tafseer_refs"]) for v in context["surah_data"]["verses"])
+        results.append({
+            "stage": stage,
+            "verses": verse_count,
+            "notes": note_count,
+            "html_bytes": html_bytes,
+            "seconds": seconds,
+            "mb_per_second": html_bytes / seconds / 1e6 if seconds else 0.0,
+            "verses_per_second": verse_count / seconds if seconds else 0.0,
+            "peak_rss_bytes": peak,
+        })
+    return results
+
+def benchmark_crawl(surah_ids, settings):
+    """
+    Crawl surahs with newap against a local mock server and report the time
+    taken and what the server saw
+    """
+    server = mock_server.MockTafheemServer(settings).start()
+    original_base_url = newap.BASE_URL
+    original_dir = os.getcwd()
+    newap.BASE_URL = server.base_url
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            # download_surah_html writes to html_files/ in the current directory
+            os.chdir(work_dir)
+            start = time.perf_counter()
+            downloaded = 0
+            with redirect_stdout(io.StringIO()):
+                for surah_id in surah_ids:
+                    total_verses = newap.get_total_verses(surah_id)
+                    if total_verses and newap.download_surah_html(surah_id, total_verses):
+                        downloaded += 1
+            seconds = time.perf_counter() - start
+    finally:
+        os.chdir(original_dir)
+        newap.BASE_URL = original_base_url
+        server_stats = server.get_stats()
+        server.stop()
+
+    return {
+        "surahs": len(surah_ids),
+        "downloaded": downloaded,
+        "seconds": seconds,
+        "surahs_per_second": len(surah_ids) / seconds if seconds else 0.0,
+        "server": server_stats,
+    }
+
+def measure_startup(module):
+    """
+    Import a module in a fresh interpreter with -X importtime and report its
+    cumulative import time and which heavy dependencies came with it
+    """
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True,
+    )
+    wall_seconds = time.perf_counter() - start
+
+    cumulative_us = 0
+    loaded = set()
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line.split("|")
+        name = parts[2].strip()
+        if name.split(".")[0] in HEAVY_DEPENDENCIES:
+            loaded.add(name.split(".")[0])
+        if name == module and parts[1].strip().isdigit():
+            cumulative_us = int(parts[1].strip())
+
+    return {
+        "module": module,
+        "import_ms": cumulative_us / 1000,
+        "process_ms": wall_seconds * 1000,
+        "heavy_dependencies": sorted(loaded),
+    }
+
+def compare_with_baseline(results, baseline, tolerance):
+    """
+    Return the stages that got slower or bigger than the baseline by more than tolerance
+    """
+    previous = {(r["stage"], r["verses"]): r for r in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get((result["stage"], result["verses"]))
+        if not old:
+            continue
+        # Baselines from before peak_rss_bytes only compare on time
+        for key in ("seconds", "peak_rss_bytes"):
+            if old.get(key) and result[key] > old[key] * (1 + tolerance):
+                regressions.append((result["stage"], result["verses"], key, old[key], result[key]))
+    return regressions
+
+def print_results(results):
+    print(f"{'stage':<6} {'verses':>6} {'notes':>6} {'seconds':>9} {'MB/s':>8} {'verses/s':>9} {'peak RSS MB':>11}")
+    for r in results:
+        print(f"{r['stage']:<6} {r['verses']:>6} {r['notes']:>6} {r['seconds']:>9.4f} "
+              f"{r['mb_per_second']:>8.2f} {r['verses_per_second']:>9.1f} {r['peak_rss_bytes'] / 1e6:>11.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark parse, JSON and DOCX stages on synthetic fixtures")
+    parser.add_argument("--sizes", default="small,medium,baqarah",
+                        help=f"comma separated verse counts or names ({', '.join(fixtures.SURAH_SIZES)})")
+    parser.add_argument("--repeat", type=int, default=3, help="timing runs per stage, the best one is reported")
+    parser.add_argument("--notes-per-verse", type=float, default=1.2)
+    parser.add_argument("--footnotes", action="store_true", help="benchmark the footnote DOCX rendering mode")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown or memory growth over the baseline (0.25 = 25%%)")
+    parser.add_argument("--crawl", type=int, default=0,
+                        help="also crawl this many surahs from a local mock server")
+    parser.add_argument("--latency", type=float, default=0.0, help="mock server latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="mock server 5xx error share")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="mock server 429 share")
+    parser.add_argument("--startup", action="store_true",
+                        help="only measure the import time of the entry points with python -X importtime")
+    args = parser.parse_args()
+
+    if args.startup:
+        print(f"{'module':<12} {'import ms':>10} {'process ms':>11}  heavy dependencies")
+        for module in STARTUP_MODULES:
+            startup = measure_startup(module)
+            print(f"{startup['module']:<12} {startup['import_ms']:>10.1f} {startup['process_ms']:>11.1f}  "
+                  f"{', '.join(startup['heavy_dependencies']) or '-'}")
+        sys.exit(0)
+
+    if args.crawl:
+        settings = mock_server.MockSettings(latency=args.latency, error_rate=args.error_rate,
+                                            throttle_rate=args.throttle_rate, seed=0)
+        crawl = benchmark_crawl([str(i) for i in range(1, args.crawl + 1)], settings)
+        print(f"crawl: {crawl['downloaded']}/{crawl['surahs']} surahs in {crawl['seconds']:.2f}s "
+              f"({crawl['surahs_per_second']:.2f} surahs/s), server saw {crawl['server']}")
+
+    all_results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for verse_count in fixtures.parse_sizes(args.sizes):
+            all_results.extend(benchmark_size(verse_count, work_dir, args.repeat, args.notes_per_verse, args.footnotes))
+
+    print_results(all_results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(all_results, f, indent=2)
+        print(f"✅ Results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare_with_baseline(all_results, json.load(f), args.tolerance)
+        for stage, verses, key, old, new in regressions:
+            print(f"❌ {stage} ({verses} verses): {key} {old:.4g} -> {new:.4g}")
+        if regressions:
+            sys.exit(1)
+        print("✅ No regressions against baseline")
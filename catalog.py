@@ -0,0 +1,42 @@
+# Number of verses in each surah, indexed by surah number - 1
+SURAH_VERSE_COUNTS = [
+    7, 286, 200, 176, 120, 165, 206, 75, 129, 109,
+    123, 111, 43, 52, 99, 128, 111, 110, 98, 135,
+    112, 78, 118, 64, 77, 227, 93, 88, 69, 60,
+    34, 30, 73, 54, 45, 83, 182, 88, 75, 85,
+    54, 53, 89, 59, 37, 35, 38, 29, 18, 45,
+    60, 49, 62, 55, 78, 96, 29, 22, 24, 13,
+    14, 11, 11, 18, 12, 12, 30, 52, 52, 44,
+    28, 28, 20, 56, 40, 31, 50, 40, 46, 42,
+    29, 19, 36, 25, 22, 17, 19, 26, 30, 20,
+    15, 21, 11, 8, 8, 19, 5, 8, 8, 11,
+    11, 8, 3, 9, 5, 4, 7, 3, 6, 3,
+    5, 4, 5, 6,
+]
+
+# Urdu names of the surahs as tafheem cites them, without the article ال
+SURAH_NAMES = [
+    "فاتحہ", "بقرہ", "آل عمران", "نساء", "مائدہ", "انعام", "اعراف", "انفال", "توبہ", "یونس",
+    "ہود", "یوسف", "رعد", "ابراہیم", "حجر", "نحل", "بنی اسرائیل", "کہف", "مریم", "طہ",
+    "انبیاء", "حج", "مومنون", "نور", "فرقان", "شعراء", "نمل", "قصص", "عنکبوت", "روم",
+    "لقمان", "سجدہ", "احزاب", "سبا", "فاطر", "یس", "صافات", "ص", "زمر", "مومن",
+    "حم السجدہ", "شوری", "زخرف", "دخان", "جاثیہ", "احقاف", "محمد", "فتح", "حجرات", "ق",
+    "ذاریات", "طور", "نجم", "قمر", "رحمن", "واقعہ", "حدید", "مجادلہ", "حشر", "ممتحنہ",
+    "صف", "جمعہ", "منافقون", "تغابن", "طلاق", "تحریم", "ملک", "قلم", "حاقہ", "معارج",
+    "نوح", "جن", "مزمل", "مدثر", "قیامہ", "دہر", "مرسلات", "نبا", "نازعات", "عبس",
+    "تکویر", "انفطار", "مطففین", "انشقاق", "بروج", "طارق", "اعلی", "غاشیہ", "فجر", "بلد",
+    "شمس", "لیل", "ضحی", "الم نشرح", "تین", "علق", "قدر", "بینہ", "زلزال", "عادیات",
+    "قارعہ", "تکاثر", "عصر", "ہمزہ", "فیل", "قریش", "ماعون", "کوثر", "کافرون", "نصر",
+    "لہب", "اخلاص", "فلق", "ناس",
+]
+
+TOTAL_SURAHS = len(SURAH_VERSE_COUNTS)
+
+def get_verse_count(surah_id):
+    """
+    Return the catalog verse count for a surah, or 0 for an unknown surah
+    """
+    surah_number = int(surah_id)
+    if 1 <= surah_number <= TOTAL_SURAHS:
+        return SURAH_VERSE_COUNTS[surah_number - 1]
+    return 0
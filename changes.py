@@ -0,0 +1,136 @@
+import os
+import sys
+import json
+import hashlib
+import argparse
+
+from corpus import iter_corpus, get_tafseer_notes
+
+MANIFEST_FORMAT = "tafheem-hashes-v1"
+MANIFEST_FILENAME = "corpus_hashes.json"
+
+# Joins the fields of a verse before hashing, never present in page text
+FIELD_SEPARATOR = "\x1f"
+
+def hash_text(text):
+    """
+    Short content hash, 64 bits is plenty to spot changes in a few thousand records
+    """
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+def hash_verse(verse):
+    return hash_text(FIELD_SEPARATOR.join([
+        verse.get("arabic", ""),
+        verse.get("urdu", ""),
+        verse.get("tafseer", ""),
+        ",".join(verse.get("tafseer_refs") or []),
+    ]))
+
+def build_manifest(surahs):
+    """
+    Hash every verse and note of the corpus.
+
+    Each surah also gets a hash over its verse and note hashes, so a diff
+    can skip unchanged surahs without looking at their verses.
+    """
+    manifest = {"format": MANIFEST_FORMAT, "surahs": {}}
+    for surah in surahs:
+        verses = {str(verse["verse_number"]): hash_verse(verse) for verse in surah["verses"]}
+        notes = {ref: hash_text(text) for ref, text in get_tafseer_notes(surah).items()}
+        surah_hash = hash_text(json.dumps([verses, notes], sort_keys=True))
+        manifest["surahs"][str(surah["surah_id"])] = {"hash": surah_hash, "verses": verses, "notes": notes}
+    return manifest
+
+def write_manifest(surahs, manifest_path):
+    manifest = build_manifest(surahs)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    return manifest
+
+def load_manifest(path):
+    """
+    Load a hash manifest, or build one from a corpus file or folder
+    """
+    if os.path.isfile(path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict) and data.get("format") == MANIFEST_FORMAT:
+            return data
+    return build_manifest(iter_corpus(path))
+
+def diff_records(old_records, new_records, surah_id, delta):
+    """
+    Compare {key: hash} maps of one surah, adding "surah:key" ids to delta
+    """
+    for key, record_hash in new_records.items():
+        if key not in old_records:
+            delta["added"].append(f"{surah_id}:{key}")
+        elif old_records[key] != record_hash:
+            delta["modified"].append(f"{surah_id}:{key}")
+    for key in old_records:
+        if key not in new_records:
+            delta["removed"].append(f"{surah_id}:{key}")
+
+def diff_manifests(old_manifest, new_manifest):
+    """
+    Return the added, removed and modified verses and notes between two manifests
+    """
+    old_surahs = old_manifest["surahs"]
+    new_surahs = new_manifest["surahs"]
+    delta = {
+        "surahs": {"added": [], "removed": [], "modified": []},
+        "verses": {"added": [], "removed": [], "modified": []},
+        "notes": {"added": [], "removed": [], "modified": []},
+    }
+
+    for surah_id in sorted(set(old_surahs) | set(new_surahs), key=int):
+        old = old_surahs.get(surah_id)
+        new = new_surahs.get(surah_id)
+        if old and new and old["hash"] == new["hash"]:
+            continue
+        if not old:
+            delta["surahs"]["added"].append(surah_id)
+        elif not new:
+            delta["surahs"]["removed"].append(surah_id)
+        else:
+            delta["surahs"]["modified"].append(surah_id)
+
+        diff_records((old or {}).get("verses", {}), (new or {}).get("verses", {}), surah_id, delta["verses"])
+        diff_records((old or {}).get("notes", {}), (new or {}).get("notes", {}), surah_id, delta["notes"])
+
+    return delta
+
+def count_changes(delta):
+    return sum(len(ids) for kind in ("verses", "notes") for ids in delta[kind].values())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hash corpus verses and notes, and diff two corpus snapshots")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    hash_parser = commands.add_parser("hash", help="write the hash manifest of a corpus")
+    hash_parser.add_argument("corpus", nargs="?", default="all_surahs.json",
+                             help="all_surahs.json, a surah JSON file or a folder of them")
+    hash_parser.add_argument("-o", "--output", default=MANIFEST_FILENAME)
+
+    diff_parser = commands.add_parser("diff", help="compare two snapshots (corpus files, folders or manifests)")
+    diff_parser.add_argument("old")
+    diff_parser.add_argument("new")
+    diff_parser.add_argument("-o", "--output", help="write the delta as JSON to this file")
+    diff_parser.add_argument("--exit-code", action="store_true", help="exit with 1 when anything changed")
+
+    args = parser.parse_args()
+
+    if args.command == "hash":
+        manifest = write_manifest(iter_corpus(args.corpus), args.output)
+        print(f"✅ Hashed {len(manifest['surahs'])} surahs into {args.output}")
+    else:
+        delta = diff_manifests(load_manifest(args.old), load_manifest(args.new))
+        for kind in ("surahs", "verses", "notes"):
+            counts = ", ".join(f"{change} {len(ids)}" for change, ids in delta[kind].items())
+            print(f"{kind:<7} {counts}")
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(delta, f, indent=2)
+            print(f"✅ Delta saved to {args.output}")
+        if args.exit_code and count_changes(delta):
+            sys.exit(1)
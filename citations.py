@@ -0,0 +1,271 @@
+import re
+import sys
+import json
+import time
+import argparse
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+
+import catalog
+from corpus import iter_corpus, get_tafseer_notes
+from normalization import normalize_text
+
+GRAPH_FORMAT = "tafheem-citations-v1"
+GRAPH_FILENAME = "citations.json"
+
+# Other spellings of surah names found in the notes, on top of catalog.SURAH_NAMES
+SURAH_NAME_ALIASES = {
+    "فاتحۃ": 1, "اسراء": 17, "مؤمنون": 23, "سبأ": 34, "یاسین": 36, "مؤمن": 40, "غافر": 40,
+    "فصلت": 41, "انسان": 76, "نباء": 78, "انشراح": 94, "زلزلہ": 99,
+}
+
+# Names that are also everyday Urdu words, letters or people, e.g. جن (who),
+# ملک (country), ص (page). They only count as surahs after سورۂ or ال.
+COMMON_WORD_NAMES = {
+    "ص", "ق", "نور", "ملک", "جن", "قدر", "حج", "عصر", "فجر", "فتح", "توبہ", "سجدہ", "مومن", "مومنون",
+    "مؤمن", "مؤمنون", "محمد", "رحمن", "واقعہ", "جمعہ", "طلاق", "قلم", "دہر", "انسان", "تین", "فیل",
+    "نصر", "ناس", "لیل", "شمس", "قمر", "نجم", "طور", "بلد", "صف", "حشر", "حدید", "دخان", "قصص",
+    "انعام", "اعلی", "حجر", "رعد", "نحل", "نمل", "کہف", "فرقان", "روم", "کوثر", "کافرون", "طارق",
+    "یونس", "ہود", "یوسف", "ابراہیم", "مریم", "نوح", "لقمان",
+}
+
+# Harakat, superscript alef and Quranic marks, which some notes carry in names
+DIACRITICS_PATTERN = re.compile(r'[\u064b-\u065f\u0670\u06d6-\u06ed]')
+# Digits to ASCII, and teh marbuta (Arabic and Urdu) to heh goal: notes write
+# both سورۃ البقرۃ and سورۂ بقرہ
+FOLDED_CHARACTERS = str.maketrans("۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩ةۃ", "01234567890123456789ہہ")
+
+# How far back a bare "آیت 5" looks for the surah it belongs to
+MENTION_WINDOW = 80
+
+def fold_text(text, kind="tafseer"):
+    return DIACRITICS_PATTERN.sub("", normalize_text(text, kind)).translate(FOLDED_CHARACTERS)
+
+def compile_citation_pattern():
+    """
+    One pattern for every citation form, so each note is scanned once:
+
+        سورۂ بقرہ، آیت 255      البقرہ:255      سورۂ 2، آیات 10-12
+        سورۂ بقرہ کی آیت 25     (2:255)         آیت 30 (a verse of the note's own surah)
+
+    A name needs سورۂ or ال in front, except for names that are not also
+    common words (COMMON_WORD_NAMES), which may stand alone before a verse
+    word or colon: بقرہ، آیت 255.
+
+    Also returns the pattern of a surah mention that closes the text before
+    a bare verse word, as in سورۂ نساء کے شروع میں آیت 3, and the name table.
+    """
+    names = {fold_text(name, "urdu"): number for number, name in enumerate(catalog.SURAH_NAMES, 1)}
+    names.update({fold_text(name, "urdu"): number for name, number in SURAH_NAME_ALIASES.items()})
+    # Longest first, so "حم السجدہ" wins over "سجدہ"
+    ordered_names = sorted(names, key=len, reverse=True)
+    common_words = {fold_text(name, "urdu") for name in COMMON_WORD_NAMES}
+    name_pattern = "|".join(re.escape(name) for name in ordered_names)
+    bare_name_pattern = "|".join(re.escape(name) for name in ordered_names if name not in common_words)
+
+    digit = r'[0-9]'
+    surah_word = r'سور(?:ۂ|ہ|ت)'
+    verse_word = r'(?:آیات|آیتیں|آیت)\s*(?:نمبر\s*)?'
+    postposition = r'(?:(?:کی|کے|میں)\s+)?'
+    verse_range = rf'(?P<{{0}}>{digit}{{{{1,3}}}})(?:\s*(?:-|–|تا)\s*(?P<{{1}}>{digit}{{{{1,3}}}}))?'
+
+    pattern = "|".join([
+        rf'(?:{surah_word}\s+(?:ال)?|(?<!\w)ال)(?P<name>{name_pattern})(?!\w)\s*(?:[،,]?\s*{postposition}{verse_word}|:\s*(?:{verse_word})?)'
+        + verse_range.format("name_verse", "name_end"),
+        rf'(?<!\w)(?P<bare>{bare_name_pattern})(?!\w)\s*(?:[،,]?\s*{verse_word}|:\s*(?:{verse_word})?)'
+        + verse_range.format("bare_verse", "bare_end"),
+        rf'{surah_word}\s+(?P<number>{digit}{{1,3}})\s*[،,]?\s*{postposition}{verse_word}' + verse_range.format("number_verse", "number_end"),
+        rf'[(\[]\s*(?P<pair>{digit}{{1,3}})\s*:\s*' + verse_range.format("pair_verse", "pair_end") + r'\s*[)\]]',
+        rf'(?<!\w){verse_word}' + verse_range.format("own_verse", "own_end"),
+    ])
+    # Greedy .* picks the last mention; it must reach the verse word within
+    # the same sentence
+    mention_pattern = (rf'.*{surah_word}\s+(?:ال)?(?:(?P<name>{name_pattern})|(?P<number>{digit}{{1,3}}))(?!\w)'
+                       r'[^۔.؟?!()\[\]\n]*$')
+    return re.compile(pattern), re.compile(mention_pattern), names
+
+CITATION_PATTERN, SURAH_MENTION_PATTERN, SURAH_NUMBERS = compile_citation_pattern()
+
+# Global verse number of the first verse of each surah, for the compact index
+VERSE_OFFSETS = [0] + list(accumulate(catalog.SURAH_VERSE_COUNTS))
+TOTAL_VERSES = VERSE_OFFSETS[-1]
+
+def get_verse_id(surah_number, verse_number):
+    return VERSE_OFFSETS[surah_number - 1] + verse_number - 1
+
+def get_verse_key(verse_id):
+    surah_number = bisect_right(VERSE_OFFSETS, verse_id)
+    return f"{surah_number}:{verse_id - VERSE_OFFSETS[surah_number - 1] + 1}"
+
+def extract_citations(text, surah_id):
+    """
+    Return the (surah, verse) pairs cited in a note of surah_id, in order,
+    with ranges expanded. Verses the catalog does not have are dropped.
+    """
+    text = fold_text(text)
+    citations = []
+    for match in CITATION_PATTERN.finditer(text):
+        groups = match.groupdict()
+        if groups["name"]:
+            surah_number, kind = SURAH_NUMBERS[groups["name"]], "name"
+        elif groups["bare"]:
+            surah_number, kind = SURAH_NUMBERS[groups["bare"]], "bare"
+        elif groups["number"]:
+            surah_number, kind = int(groups["number"]), "number"
+        elif groups["pair"]:
+            surah_number, kind = int(groups["pair"]), "pair"
+        else:
+            surah_number, kind = int(surah_id), "own"
+            mention = SURAH_MENTION_PATTERN.match(text, max(0, match.start() - MENTION_WINDOW), match.start())
+            if mention:
+                surah_number = SURAH_NUMBERS[mention["name"]] if mention["name"] else int(mention["number"])
+
+        verse_count = catalog.get_verse_count(surah_number)
+        first = int(groups[f"{kind}_verse"])
+        last = int(groups[f"{kind}_end"] or first)
+        if not 1 <= first <= last <= verse_count:
+            continue
+        citations.extend((surah_number, verse) for verse in range(first, last + 1))
+    return citations
+
+class CitationGraph:
+    """
+    Notes -> cited verses, and verses -> citing notes, as compressed sparse rows.
+
+    Verses are numbered 0..6235 through the catalog and notes by position.
+    Each direction is an offsets array and a targets array, so the
+    neighbours of any node are one slice, found in constant time.
+    """
+    def __init__(self, note_keys, note_offsets, note_targets, verse_offsets, verse_sources):
+        self.note_keys = note_keys
+        self.note_numbers = {key: number for number, key in enumerate(note_keys)}
+        self.note_offsets = note_offsets
+        self.note_targets = note_targets
+        self.verse_offsets = verse_offsets
+        self.verse_sources = verse_sources
+
+    @classmethod
+    def from_edges(cls, note_keys, edges):
+        """
+        Build from note_keys and a list of cited verse ids per note
+        """
+        note_offsets = array("I", [0])
+        note_targets = array("H")
+        incoming = [[] for _ in range(TOTAL_VERSES)]
+        for note_number, verse_ids in enumerate(edges):
+            verse_ids = sorted(set(verse_ids))
+            note_targets.extend(verse_ids)
+            note_offsets.append(len(note_targets))
+            for verse_id in verse_ids:
+                incoming[verse_id].append(note_number)
+
+        verse_offsets = array("I", [0])
+        verse_sources = array("I")
+        for note_numbers in incoming:
+            verse_sources.extend(note_numbers)
+            verse_offsets.append(len(verse_sources))
+        return cls(note_keys, note_offsets, note_targets, verse_offsets, verse_sources)
+
+    def __len__(self):
+        return len(self.note_targets)
+
+    def notes_citing(self, surah_id, verse_number):
+        """
+        Return the "surah:ref" keys of the notes citing a verse
+        """
+        surah_number, verse_number = int(surah_id), int(verse_number)
+        if not 1 <= verse_number <= catalog.get_verse_count(surah_number):
+            return []
+        verse_id = get_verse_id(surah_number, verse_number)
+        sources = self.verse_sources[self.verse_offsets[verse_id]:self.verse_offsets[verse_id + 1]]
+        return [self.note_keys[note_number] for note_number in sources]
+
+    def cited_by(self, note_key):
+        """
+        Return the "surah:verse" keys a note cites
+        """
+        note_number = self.note_numbers.get(note_key)
+        if note_number is None:
+            return []
+        targets = self.note_targets[self.note_offsets[note_number]:self.note_offsets[note_number + 1]]
+        return [get_verse_key(verse_id) for verse_id in targets]
+
+    def most_cited(self, count=10):
+        degrees = [(self.verse_offsets[i + 1] - self.verse_offsets[i], i) for i in range(TOTAL_VERSES)]
+        return [(get_verse_key(verse_id), degree) for degree, verse_id in sorted(degrees, reverse=True)[:count] if degree]
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "format": GRAPH_FORMAT,
+                "notes": self.note_keys,
+                "note_offsets": self.note_offsets.tolist(),
+                "note_targets": self.note_targets.tolist(),
+                "verse_offsets": self.verse_offsets.tolist(),
+                "verse_sources": self.verse_sources.tolist(),
+            }, f, separators=(",", ":"))
+
+def load_citation_graph(path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("format") != GRAPH_FORMAT:
+        raise ValueError(f"{path} is not a citation graph")
+    return CitationGraph(data["notes"], array("I", data["note_offsets"]), array("H", data["note_targets"]),
+                         array("I", data["verse_offsets"]), array("I", data["verse_sources"]))
+
+def build_citation_graph(surahs):
+    """
+    Scan every tafseer note of the corpus for verse citations
+    """
+    note_keys = []
+    edges = []
+    for surah in surahs:
+        for ref, text in get_tafseer_notes(surah).items():
+            note_keys.append(f"{surah['surah_id']}:{ref}")
+            edges.append([get_verse_id(surah_number, verse) for surah_number, verse in
+                          extract_citations(text, surah["surah_id"])])
+    return CitationGraph.from_edges(note_keys, edges)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index the verses cited inside tafseer notes")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="scan a corpus and write the citation graph")
+    build_parser.add_argument("corpus", nargs="?", default="all_surahs.json",
+                              help="all_surahs.json, a surah JSON file or a folder of them")
+    build_parser.add_argument("-o", "--output", default=GRAPH_FILENAME)
+
+    verse_parser = commands.add_parser("verse", help="list the notes citing a verse, e.g. 2:255")
+    verse_parser.add_argument("verse")
+    verse_parser.add_argument("--graph", default=GRAPH_FILENAME)
+
+    note_parser = commands.add_parser("note", help="list the verses a note cites, e.g. 3:12")
+    note_parser.add_argument("note")
+    note_parser.add_argument("--graph", default=GRAPH_FILENAME)
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        graph = build_citation_graph(iter_corpus(args.corpus))
+        graph.write(args.output)
+        citing_notes = sum(1 for i in range(len(graph.note_keys)) if graph.note_offsets[i + 1] > graph.note_offsets[i])
+        print(f"Found {len(graph)} citations in {citing_notes}/{len(graph.note_keys)} notes "
+              f"({time.perf_counter() - start:.2f}s)")
+        for verse_key, degree in graph.most_cited(5):
+            print(f"   ↳ {verse_key} cited by {degree} notes")
+        print(f"✅ Citation graph saved to {args.output}")
+        sys.exit(0)
+
+    graph = load_citation_graph(args.graph)
+    if args.command == "verse":
+        surah_id, _, verse_number = args.verse.partition(":")
+        results = graph.notes_citing(surah_id, verse_number or 0)
+    else:
+        results = graph.cited_by(args.note)
+    for key in results:
+        print(key)
+    if not results:
+        print(f"No citations for {getattr(args, args.command)}")
+        sys.exit(1)
@@ -0,0 +1,181 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+
+import catalog
+from corpus import iter_corpus, get_tafseer_notes
+from html_archive import open_html_source
+
+REPORT_FORMAT = "tafheem-consistency-v1"
+REPORT_FILENAME = "consistency_report.json"
+
+CHECKS = (
+    "missing_surah",        # a catalog surah is not in the corpus (only with --expect-all)
+    "verse_count",          # parsed verses differ from the catalog or from total_verses
+    "span_count",           # the page has a different number of Arabic and Urdu spans
+    "missing_translation",  # a verse has Arabic text but no Urdu
+    "ref_without_note",     # a verse links a note number the surah does not have
+    "unreferenced_note",    # a note no verse links to
+)
+
+# Enough of the page structure to count spans the way htmljson's find_all does,
+# without building a soup: the ar and ur divs hold no nested divs
+DIV_PATTERNS = {
+    kind: re.compile(rf'<div\b[^>]*\bclass=["\']{kind}["\'][^>]*>(.*?)</div>', re.S | re.I)
+    for kind in ("ar", "ur")
+}
+SPAN_PATTERN = re.compile(r'<span\b([^>]*)>', re.I)
+NUMBER_CLASS_PATTERN = re.compile(r'\bclass=["\'][^"\']*\bnm\b', re.I)
+
+# The HTML source of this process, opened once by open_worker_source
+worker_source = None
+
+def count_spans(html_content):
+    """
+    Return the (arabic, urdu) span counts of a surah page, verse numbers excluded
+    """
+    counts = []
+    for kind in ("ar", "ur"):
+        div_match = DIV_PATTERNS[kind].search(html_content)
+        spans = SPAN_PATTERN.findall(div_match.group(1)) if div_match else []
+        if kind == "ar":
+            spans = [attributes for attributes in spans if not NUMBER_CLASS_PATTERN.search(attributes)]
+        counts.append(len(spans))
+    return tuple(counts)
+
+def resolve_ref(ref, notes):
+    """
+    The note key a verse ref points to, matched like htmljson does, or None
+    """
+    if ref in notes:
+        return ref
+    if ref.isdigit() and str(int(ref)) in notes:
+        return str(int(ref))
+    return None
+
+def check_surah(surah, source=None):
+    """
+    Run every per-surah check, returning a list of violations. source is an
+    opened HtmlArchive or HtmlDirectory, for the span count check.
+    """
+    surah_id = str(surah["surah_id"])
+    verses = surah["verses"]
+    notes = get_tafseer_notes(surah)
+    violations = []
+
+    def add(check, **details):
+        violations.append({"check": check, "surah_id": surah_id, **details})
+
+    expected = catalog.get_verse_count(surah_id)
+    if len(verses) != expected or surah.get("total_verses", len(verses)) != len(verses):
+        add("verse_count", verses=len(verses), total_verses=surah.get("total_verses"), catalog=expected)
+
+    if source:
+        html_content = source.read_surah(surah_id)
+        if html_content is not None:
+            arabic_spans, urdu_spans = count_spans(html_content)
+            if arabic_spans != urdu_spans:
+                add("span_count", arabic=arabic_spans, urdu=urdu_spans)
+
+    referenced = set()
+    for verse in verses:
+        if verse.get("arabic") and not verse.get("urdu"):
+            add("missing_translation", verse=verse["verse_number"])
+        for ref in verse.get("tafseer_refs") or []:
+            note_key = resolve_ref(ref, notes)
+            if note_key is None:
+                add("ref_without_note", verse=verse["verse_number"], ref=ref)
+            else:
+                referenced.add(note_key)
+
+    for note_key in notes:
+        if note_key not in referenced:
+            add("unreferenced_note", note=note_key)
+    return violations
+
+def open_worker_source(html_source):
+    """
+    Pool initializer: open the HTML source once per process, read-only so
+    no worker creates or repairs archive files
+    """
+    global worker_source
+    worker_source = open_html_source(html_source, read_only=True) if html_source else None
+
+def check_surah_job(surah):
+    return check_surah(surah, worker_source)
+
+def check_corpus(surahs, html_source=None, processes=None, expect_all=False):
+    """
+    Check every surah, spread over a pool of processes, and return the
+    violations in surah order
+    """
+    jobs = list(surahs)
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(jobs) < 2:
+        open_worker_source(html_source)
+        try:
+            results = [check_surah_job(job) for job in jobs]
+        finally:
+            if worker_source:
+                worker_source.close()
+    else:
+        with multiprocessing.Pool(min(processes, len(jobs)), initializer=open_worker_source,
+                                  initargs=(html_source,)) as pool:
+            results = pool.map(check_surah_job, jobs, chunksize=max(1, len(jobs) // (processes * 4)))
+    violations = [violation for result in results for violation in result]
+
+    if expect_all:
+        present = {str(surah["surah_id"]) for surah in jobs}
+        violations.extend({"check": "missing_surah", "surah_id": str(surah_number)}
+                          for surah_number in range(1, catalog.TOTAL_SURAHS + 1) if str(surah_number) not in present)
+    return len(jobs), sorted(violations, key=lambda violation: int(violation["surah_id"]))
+
+def build_report(surah_count, violations, ignored=()):
+    counts = {check: 0 for check in CHECKS}
+    for violation in violations:
+        counts[violation["check"]] += 1
+    failing = sum(count for check, count in counts.items() if check not in ignored)
+    return {
+        "format": REPORT_FORMAT,
+        "surahs": surah_count,
+        "violations": failing,
+        "ignored": sorted(ignored),
+        "counts": counts,
+        "results": violations,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the whole corpus for consistency, exiting with 1 on violations")
+    parser.add_argument("corpus", nargs="?", default="all_surahs.json",
+                        help="all_surahs.json, a surah JSON file or a folder of them")
+    parser.add_argument("--html", metavar="SOURCE",
+                        help="html_files folder or .tafr archive, to also compare Arabic and Urdu span counts")
+    parser.add_argument("-o", "--output", default=REPORT_FILENAME, help="where to write the JSON report")
+    parser.add_argument("--processes", type=int, default=0, help="worker processes (default: one per CPU)")
+    parser.add_argument("--expect-all", action="store_true", help=f"report surahs missing from the {catalog.TOTAL_SURAHS}")
+    parser.add_argument("--ignore", action="append", default=[], choices=CHECKS,
+                        help="report a check without failing on it (repeatable)")
+    args = parser.parse_args()
+    if args.html and not os.path.exists(args.html):
+        parser.error(f"HTML source {args.html} not found")
+
+    start = time.perf_counter()
+    surah_count, violations = check_corpus(iter_corpus(args.corpus), args.html, args.processes, args.expect_all)
+    report = build_report(surah_count, violations, set(args.ignore))
+    report["seconds"] = round(time.perf_counter() - start, 3)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"Checked {surah_count} surahs in {report['seconds']:.2f}s")
+    for check, count in report["counts"].items():
+        if count:
+            print(f"   ↳ {check:<20} {count}{' (ignored)' if check in args.ignore else ''}")
+    if report["violations"]:
+        print(f"❌ {report['violations']} violations, see {args.output}")
+        sys.exit(1)
+    print(f"✅ No violations, report saved to {args.output}")
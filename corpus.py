@@ -0,0 +1,276 @@
+import os
+import re
+import sys
+import json
+import glob
+import mmap
+import argparse
+
+INDEX_FORMAT = "tafheem-offsets-v1"
+
+def get_surah_sort_key(surah):
+    surah_id = str(surah.get("surah_id", ""))
+    return int(surah_id) if surah_id.isdigit() else 0
+
+def load_corpus(path):
+    """
+    Load surahs from all_surahs.json, a single surah_{id}.json or a folder of
+    surah_{id}.json files, returned as a list in surah order
+    """
+    if os.path.isdir(path):
+        surahs = []
+        for json_file_path in glob.glob(os.path.join(path, "surah_*.json")):
+            with open(json_file_path, "r", encoding="utf-8") as f:
+                surahs.append(json.load(f))
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        surahs = data if isinstance(data, list) else [data]
+    return sorted(surahs, key=get_surah_sort_key)
+
+def dump_indented(value, depth):
+    """
+    json.dump(value, indent=2) as it appears nested depth levels deep
+    """
+    return json.dumps(value, ensure_ascii=False, indent=2).replace("\n", "\n" + "  " * depth)
+
+def write_corpus(surahs, path):
+    """
+    Write surahs as all_surahs.json plus an offset index ({path}.idx).
+
+    The JSON is byte for byte what json.dump(surahs, indent=2) writes, so
+    existing readers are unaffected. The index holds the byte range of
+    every surah and verse, which lets CorpusReader decode just one of them.
+    """
+    temporary_path = path + ".tmp"
+    offsets = {}
+    position = 0
+
+    with open(temporary_path, "wb") as f:
+        def write(text):
+            nonlocal position
+            data = text.encode("utf-8")
+            f.write(data)
+            position += len(data)
+
+        if not surahs:
+            write("[]")
+        else:
+            write("[\n")
+        for surah_number, surah in enumerate(surahs):
+            write(",\n  " if surah_number else "  ")
+            surah_start = position
+            verse_ranges = []
+            write("{")
+            for key_number, (key, value) in enumerate(surah.items()):
+                write(("," if key_number else "") + "\n    " + json.dumps(key, ensure_ascii=False) + ": ")
+                if key != "verses" or not value:
+                    write(dump_indented(value, 2))
+                    continue
+                write("[")
+                for verse_number, verse in enumerate(value):
+                    write(",\n      " if verse_number else "\n      ")
+                    verse_start = position
+                    write(dump_indented(verse, 3))
+                    verse_ranges.append([verse_start, position - verse_start])
+                write("\n    ]")
+            write("\n  }" if surah else "}")
+            offsets[str(surah.get("surah_id", surah_number))] = {
+                "range": [surah_start, position - surah_start],
+                "verses": verse_ranges,
+            }
+        if surahs:
+            write("\n]")
+
+    os.replace(temporary_path, path)
+    index = {"format": INDEX_FORMAT, "size": position, "surahs": offsets}
+    with open(path + ".idx", "w", encoding="utf-8") as f:
+        json.dump(index, f, separators=(",", ":"))
+    return index
+
+def load_offset_index(path):
+    """
+    Return the offset index of a corpus file, or None when it is missing or
+    the file was rewritten after it
+    """
+    try:
+        with open(path + ".idx", "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get("format") != INDEX_FORMAT or index["size"] != os.path.getsize(path):
+        return None
+    return index
+
+class CorpusReader:
+    """
+    Lazy, random access to the surahs and verses of a corpus.
+
+    path is an all_surahs.json written by write_corpus, read through an mmap
+    and its offset index, or a folder of surah_{id}.json shards. Either way
+    only the requested surah or verse is decoded, so memory follows the
+    record being read rather than the corpus.
+    """
+    def __init__(self, path="all_surahs.json"):
+        self.path = path
+        self.file = None
+        self.mapped = None
+        self.shards = {}
+        self.index = {}
+
+        if os.path.isdir(path):
+            for json_file_path in glob.glob(os.path.join(path, "surah_*.json")):
+                surah_id = os.path.basename(json_file_path)[len("surah_"):-len(".json")]
+                if surah_id.isdigit():
+                    self.shards[surah_id] = json_file_path
+            return
+
+        index = load_offset_index(path)
+        if index is None:
+            raise ValueError(f"No up to date offset index for {path}, run: python corpus.py index {path}")
+        self.index = index["surahs"]
+        self.file = open(path, "rb")
+        if index["size"]:
+            self.mapped = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            # A file rewritten to the same size would still be caught here
+            for entry in self.index.values():
+                offset, length = entry["range"]
+                if self.mapped[offset:offset + 1] != b"{" or self.mapped[offset + length - 1:offset + length] != b"}":
+                    self.close()
+                    raise ValueError(f"Offset index of {path} does not match the file, run: python corpus.py index {path}")
+
+    def close(self):
+        if self.mapped:
+            self.mapped.close()
+            self.mapped = None
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.shards or self.index)
+
+    def decode(self, byte_range):
+        offset, length = byte_range
+        return json.loads(self.mapped[offset:offset + length].decode("utf-8"))
+
+    def surah_ids(self):
+        return sorted(self.shards or self.index, key=int)
+
+    def get_surah(self, surah_id):
+        surah_id = str(surah_id)
+        if self.shards:
+            with open(self.shards[surah_id], "r", encoding="utf-8") as f:
+                return json.load(f)
+        return self.decode(self.index[surah_id]["range"])
+
+    def iter_surahs(self):
+        for surah_id in self.surah_ids():
+            yield self.get_surah(surah_id)
+
+    def get_verse(self, surah_id, verse_number):
+        """
+        Return verse verse_number (1-based, in file order) of a surah
+        """
+        surah_id = str(surah_id)
+        if self.shards:
+            return self.get_surah(surah_id)["verses"][int(verse_number) - 1]
+        return self.decode(self.index[surah_id]["verses"][int(verse_number) - 1])
+
+    def iter_verses(self, surah_id=None):
+        """
+        Yield (surah_id, verse) for one surah, or the whole corpus
+        """
+        for current_id in [str(surah_id)] if surah_id is not None else self.surah_ids():
+            if self.shards:
+                for verse in self.get_surah(current_id)["verses"]:
+                    yield current_id, verse
+            else:
+                for verse_range in self.index[current_id]["verses"]:
+                    yield current_id, self.decode(verse_range)
+
+def iter_corpus(path):
+    """
+    Yield the surahs of a corpus one at a time, lazily when path is a folder
+    or an indexed all_surahs.json, otherwise by loading it whole
+    """
+    if os.path.isdir(path) or load_offset_index(path):
+        with CorpusReader(path) as reader:
+            yield from reader.iter_surahs()
+    else:
+        yield from load_corpus(path)
+
+def build_tafseer_index(verses):
+    """
+    Build a map of tafseer ref number -> single note text.
+
+    Each verse's `tafseer` field holds all of its notes joined with a blank
+    line, and every note paragraph starts with its own number, so the
+    combined string is split once here instead of being repeated per ref.
+    """
+    tafseer_index = {}
+    
+    for verse in verses:
+        refs = verse.get('tafseer_refs') or []
+        if not refs or not verse.get('tafseer'):
+            continue
+        
+        chunks = [chunk.strip() for chunk in verse['tafseer'].split("\n\n") if chunk.strip()]
+        
+        # Method 1: match each note by its leading number
+        unmatched = []
+        for chunk in chunks:
+            num_match = re.match(r'^(\d+)', chunk)
+            if num_match and str(int(num_match.group(1))) in refs:
+                tafseer_index.setdefault(str(int(num_match.group(1))), chunk)
+            else:
+                unmatched.append(chunk)
+        
+        # Method 2: fall back to ref order when the notes line up with the refs
+        missing = [ref for ref in refs if ref not in tafseer_index]
+        if missing and len(unmatched) == len(missing):
+            for ref, chunk in zip(missing, unmatched):
+                tafseer_index[ref] = chunk
+    
+    return tafseer_index
+
+def get_tafseer_notes(surah_data):
+    """
+    Return the surah's ref number -> note text map. Newer JSON files store it
+    as tafseer_notes; older ones only have it spread over the verses.
+    """
+    return surah_data.get("tafseer_notes") or build_tafseer_index(surah_data["verses"])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index all_surahs.json and read single surahs or verses from it")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    index_parser = commands.add_parser("index", help="rewrite a corpus file with its offset index")
+    index_parser.add_argument("corpus", nargs="?", default="all_surahs.json")
+
+    get_parser = commands.add_parser("get", help="print a surah (e.g. 2) or verse (e.g. 2:255)")
+    get_parser.add_argument("key")
+    get_parser.add_argument("corpus", nargs="?", default="all_surahs.json",
+                            help="indexed all_surahs.json or a folder of surah JSON files")
+
+    args = parser.parse_args()
+
+    if args.command == "index":
+        # Loads the corpus once; later reads only touch the records they need
+        index = write_corpus(load_corpus(args.corpus), args.corpus)
+        print(f"✅ Indexed {len(index['surahs'])} surahs into {args.corpus}.idx")
+    else:
+        with CorpusReader(args.corpus) as reader:
+            surah_id, _, verse_number = args.key.partition(":")
+            try:
+                record = reader.get_verse(surah_id, verse_number) if verse_number else reader.get_surah(surah_id)
+            except (KeyError, IndexError):
+                print(f"Not found: {args.key}")
+                sys.exit(1)
+            print(json.dumps(record, ensure_ascii=False, indent=2))
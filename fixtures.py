@@ -0,0 +1,195 @@
+import os
+import random
+import argparse
+from html import escape
+
+# Verse counts for a few reference surahs, Al-Baqarah being the largest
+SURAH_SIZES = {
+    "small": 7,
+    "medium": 75,
+    "large": 200,
+    "baqarah": 286,
+}
+
+CONTENT_DIV_STYLE = "margin:0px auto; max-width:800px; padding:10px;"
+
+# Letters used for the synthetic text. Both Arabic and Farsi forms of ya, kaf
+# and heh are included on purpose, as the real pages mix them.
+ARABIC_LETTERS = "ابتثجحخدذرزسشصضطظعغفقكلمنهوية"
+URDU_LETTERS = "ابپتٹثجچحخدڈذرڑزژسشصضطظعغفقکگلمنںوہھءیےيكه"
+ARABIC_MARKS = "َُِّْ"
+
+def random_word(rng, letters, min_len=2, max_len=7, marks=""):
+    word = ""
+    for _ in range(rng.randint(min_len, max_len)):
+        word += rng.choice(letters)
+        if marks and rng.random() < 0.5:
+            word += rng.choice(marks)
+    return word
+
+def random_sentence(rng, letters, word_count, marks=""):
+    return " ".join(random_word(rng, letters, marks=marks) for _ in range(word_count))
+
+def generate_surah_verses(surah_id, verse_count, notes_per_verse=1.2, seed=None):
+    """
+    Generate deterministic synthetic verse content for a surah.
+
+    Each verse gets Arabic text, Urdu text and a list of note numbers; note
+    numbers run sequentially through the surah like on tafheem.net.
+    """
+    rng = random.Random(seed if seed is not None else int(surah_id))
+    verses = []
+    next_note = 1
+
+    for i in range(verse_count):
+        # Average notes_per_verse notes per verse, some verses have none
+        note_count = int(notes_per_verse)
+        if rng.random() < notes_per_verse - note_count:
+            note_count += 1
+
+        notes = []
+        for _ in range(note_count):
+            notes.append({
+                "number": next_note,
+                "text": " ".join(
+                    random_sentence(rng, URDU_LETTERS, rng.randint(8, 20))
+                    for _ in range(rng.randint(2, 6))
+                ),
+            })
+            next_note += 1
+
+        verses.append({
+            "verse_number": i + 1,
+            "arabic": random_sentence(rng, ARABIC_LETTERS, rng.randint(6, 30), marks=ARABIC_MARKS),
+            "urdu": random_sentence(rng, URDU_LETTERS, rng.randint(10, 45)),
+            "notes": notes,
+        })
+
+    return verses
+
+def render_urdu_span(surah_id, verse):
+    """
+    Render an Urdu verse span with its note links placed between words
+    """
+    words = escape(verse["urdu"]).split(" ")
+    for position, note in enumerate(verse["notes"]):
+        link = f'<a href="F{surah_id}_{note["number"]}.html"><sup>{note["number"]}</sup></a>'
+        # Spread the links over the verse so they do not all sit at the end
+        index = min(len(words), (position + 1) * len(words) // (len(verse["notes"]) + 1))
+        words.insert(index, link)
+    return f'<span>{" ".join(words)}</span>'
+
+def render_surah_html(surah_id, verses, surah_name=None):
+    """
+    Render verses into a tafheem-shaped surah content page
+    """
+    surah_name = surah_name or f"Surah {surah_id}"
+
+    arabic_spans = []
+    urdu_spans = []
+    note_paragraphs = []
+    for verse in verses:
+        arabic_spans.append(f'<span>{escape(verse["arabic"])}</span>')
+        arabic_spans.append(f'<span class="nm">{verse["verse_number"]}</span>')
+        urdu_spans.append(render_urdu_span(surah_id, verse))
+        for note in verse["notes"]:
+            note_paragraphs.append(f'<p><n>{note["number"]} -</n> {escape(note["text"])}</p>')
+
+    return (
+        "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n"
+        f"<title>{escape(surah_name)}, Tafheem ul Quran</title>\n</head>\n<body>\n"
+        f'<div style="{CONTENT_DIV_STYLE}">\n'
+        f'<div class="ar">\n{chr(10).join(arabic_spans)}\n</div>\n'
+        f'<div class="ur">\n{chr(10).join(urdu_spans)}\n</div>\n'
+        f'<div class="nt">\n{chr(10).join(note_paragraphs)}\n</div>\n'
+        "</div>\n</body>\n</html>\n"
+    )
+
+def render_note_html(surah_id, note):
+    """
+    Render the standalone page a F{id}_{n}.html note link points to
+    """
+    return (
+        "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n"
+        f"<title>Surah {surah_id}, Note {note['number']}</title>\n</head>\n<body>\n"
+        f'<div style="{CONTENT_DIV_STYLE}">\n'
+        f'<div class="nt">\n<p><n>{note["number"]} -</n> {escape(note["text"])}</p>\n</div>\n'
+        "</div>\n</body>\n</html>\n"
+    )
+
+def render_surah_index_html(surah_id, verse_count, range_size=20):
+    """
+    Render the urduref.php?sura={id} page listing the surah's verse ranges,
+    which newap.get_total_verses reads the verse count from
+    """
+    links = []
+    for start in range(1, verse_count + 1, range_size):
+        end = min(start + range_size - 1, verse_count)
+        links.append(
+            f'<a href="urduref.php?sura={surah_id}&verse={start}-{end}">'
+            f'{start}-{end} [رکوع {len(links) + 1}]</a>'
+        )
+    return (
+        "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n"
+        f"<title>Surah {surah_id}, Tafheem ul Quran</title>\n</head>\n<body>\n"
+        f"{'<br>'.join(links)}\n</body>\n</html>\n"
+    )
+
+def render_surah_list_html(surah_ids):
+    """
+    Render the bare urduref.php page linking every surah
+    """
+    links = [f'<a href="urduref.php?sura={surah_id}">Surah {surah_id}</a>' for surah_id in surah_ids]
+    return (
+        "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n"
+        "<title>Tafheem ul Quran</title>\n</head>\n<body>\n"
+        f"{'<br>'.join(links)}\n</body>\n</html>\n"
+    )
+
+def generate_surah_html(surah_id, verse_count, notes_per_verse=1.2, seed=None):
+    verses = generate_surah_verses(surah_id, verse_count, notes_per_verse, seed)
+    return render_surah_html(surah_id, verses)
+
+def write_fixtures(output_dir, verse_counts, notes_per_verse=1.2, first_surah_id=1):
+    """
+    Write one surah_{id}_html.txt fixture per verse count into output_dir,
+    matching the layout newap.download_surah_html produces in html_files/
+    """
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    written = []
+    for offset, verse_count in enumerate(verse_counts):
+        surah_id = str(first_surah_id + offset)
+        html_file_path = os.path.join(output_dir, f"surah_{surah_id}_html.txt")
+        with open(html_file_path, "w", encoding="utf-8") as html_file:
+            html_file.write(generate_surah_html(surah_id, verse_count, notes_per_verse))
+        written.append(html_file_path)
+
+    return written
+
+def parse_sizes(value):
+    """
+    Turn "small,286,baqarah" into a list of verse counts
+    """
+    sizes = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        sizes.append(SURAH_SIZES[item] if item in SURAH_SIZES else int(item))
+    return sizes
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic tafheem-shaped surah HTML fixtures")
+    parser.add_argument("--output-dir", default="html_files")
+    parser.add_argument("--sizes", default="small,medium,baqarah",
+                        help=f"comma separated verse counts or names ({', '.join(SURAH_SIZES)})")
+    parser.add_argument("--notes-per-verse", type=float, default=1.2)
+    parser.add_argument("--first-surah", type=int, default=1)
+    args = parser.parse_args()
+
+    files = write_fixtures(args.output_dir, parse_sizes(args.sizes), args.notes_per_verse, args.first_surah)
+    for html_file_path in files:
+        print(f"   ↳ Wrote {html_file_path}")
+    print(f"✅ Generated {len(files)} fixture files in {args.output_dir}")
@@ -0,0 +1,337 @@
+import os
+import re
+import glob
+import json
+import mmap
+import time
+import zlib
+import struct
+import argparse
+import threading
+
+import catalog
+
+DEFAULT_ARCHIVE_PATH = "html_archive.tafr"
+
+# Record layout: header, URL (utf-8), zlib-compressed page (utf-8)
+RECORD_MAGIC = b"TAFR"
+RECORD_HEADER = struct.Struct("<4sBHIId")  # magic, flags, url length, payload length, crc32, fetched at
+FLAG_ZLIB = 1
+
+# Surah content pages are requested as urduref.php?sura={id}&verse=1-{count}
+SURAH_PAGE_PATTERN = re.compile(r'[?&]sura=(\d+)&verse=')
+
+def get_surah_page_url(base_url, surah_id, total_verses):
+    return f"{base_url}?sura={surah_id}&verse=1-{total_verses}"
+
+class HtmlArchive:
+    """
+    Append-only single-file store of fetched pages, WARC-like.
+
+    Each record holds a URL and its zlib-compressed page. An index file
+    next to the archive ({path}.idx) has one JSON line per record with its
+    offset, and is also only ever appended to. Reads go through an mmap of
+    the archive, so a lookup touches just the one record.
+
+    Writes are safe from several threads of one process. Several processes
+    must not append to the same archive, but any number may open it with
+    read_only, which never creates, repairs or writes a file.
+    """
+    def __init__(self, path=DEFAULT_ARCHIVE_PATH, read_only=False):
+        self.path = path
+        self.index_path = path + ".idx"
+        self.base_dir = os.path.dirname(path) or "."
+        self.read_only = read_only
+        self.lock = threading.Lock()
+        self.offsets = {}
+        self.surah_urls = {}
+        self.mapped = None
+        self.mapped_size = 0
+
+        if read_only:
+            self.archive_file = open(self.path, "rb")
+        else:
+            # Create both files so the archive can be opened for reading right away
+            for file_path in (self.path, self.index_path):
+                if not os.path.exists(file_path):
+                    open(file_path, "ab").close()
+            self.archive_file = open(self.path, "r+b")
+        self.load_index()
+
+    def close(self):
+        with self.lock:
+            if self.mapped:
+                self.mapped.close()
+                self.mapped = None
+            self.archive_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __contains__(self, url):
+        return url in self.offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def urls(self):
+        return list(self.offsets)
+
+    def add_to_index(self, url, offset):
+        # Later records for the same URL win, like a re-crawl
+        self.offsets[url] = offset
+        surah_match = SURAH_PAGE_PATTERN.search(url)
+        if surah_match:
+            self.surah_urls[surah_match.group(1)] = url
+
+    def load_index(self):
+        """
+        Read the index and bring it up to date with the archive after a crash:
+        records appended after the last index line are indexed, a half-written
+        last record is cut off, and a torn index is rebuilt by a full scan.
+        Read-only, the same records are indexed in memory and nothing is written.
+        """
+        index_text = ""
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as index_file:
+                index_text = index_file.read()
+        try:
+            entries = [json.loads(line) for line in index_text.splitlines() if line.strip()]
+            torn = bool(index_text) and not index_text.endswith("\n")
+        except ValueError:
+            entries, torn = [], True
+
+        indexed_end = 0
+        if not torn:
+            for url, offset in entries:
+                self.add_to_index(url, offset)
+            if entries:
+                # Move past the last indexed record
+                last_offset = max(offset for _, offset in entries)
+                _, _, url_length, payload_length, _, _ = self.read_header(last_offset)
+                indexed_end = last_offset + RECORD_HEADER.size + url_length + payload_length
+
+        missing, records_end = self.scan(indexed_end)
+        if not self.read_only:
+            self.repair(missing, records_end, torn)
+        for url, offset in missing:
+            self.add_to_index(url, offset)
+
+    def repair(self, missing, records_end, torn):
+        """
+        Cut the archive back to its last complete record and write the
+        missing records to the index, rewriting it if torn
+        """
+        if records_end < os.path.getsize(self.path):
+            self.archive_file.truncate(records_end)
+
+        if torn:
+            temporary_path = self.index_path + ".tmp"
+            with open(temporary_path, "w", encoding="utf-8") as index_file:
+                for url, offset in missing:
+                    index_file.write(json.dumps([url, offset], ensure_ascii=False) + "\n")
+            os.replace(temporary_path, self.index_path)
+        elif missing:
+            with open(self.index_path, "a", encoding="utf-8") as index_file:
+                for url, offset in missing:
+                    index_file.write(json.dumps([url, offset], ensure_ascii=False) + "\n")
+
+    def read_header(self, offset):
+        self.archive_file.seek(offset)
+        header = RECORD_HEADER.unpack(self.archive_file.read(RECORD_HEADER.size))
+        if header[0] != RECORD_MAGIC:
+            raise ValueError(f"No archive record at offset {offset} of {self.path}")
+        return header
+
+    def scan(self, offset=0):
+        """
+        Walk the records from offset, returning their (url, offset) pairs and
+        where the last complete record ends
+        """
+        records = []
+        file_size = os.path.getsize(self.path)
+        while offset + RECORD_HEADER.size <= file_size:
+            _, _, url_length, payload_length, _, _ = self.read_header(offset)
+            record_end = offset + RECORD_HEADER.size + url_length + payload_length
+            if record_end > file_size:
+                break  # Half-written last record
+            url = self.archive_file.read(url_length).decode("utf-8")
+            records.append((url, offset))
+            offset = record_end
+        return records, offset
+
+    def put(self, url, text, fetched_at=None):
+        """
+        Append a page to the archive
+        """
+        if self.read_only:
+            raise ValueError(f"{self.path} is open read-only")
+        url_bytes = url.encode("utf-8")
+        payload = zlib.compress(text.encode("utf-8"), 6)
+        header = RECORD_HEADER.pack(RECORD_MAGIC, FLAG_ZLIB, len(url_bytes), len(payload),
+                                    zlib.crc32(payload), fetched_at or time.time())
+        with self.lock:
+            self.archive_file.seek(0, os.SEEK_END)
+            offset = self.archive_file.tell()
+            self.archive_file.write(header + url_bytes + payload)
+            self.archive_file.flush()
+            with open(self.index_path, "a", encoding="utf-8") as index_file:
+                index_file.write(json.dumps([url, offset], ensure_ascii=False) + "\n")
+            self.add_to_index(url, offset)
+        return offset
+
+    def get_mapped(self, end):
+        """
+        Return an mmap covering at least `end` bytes, remapping after appends.
+        Call with self.lock held: a remap closes the previous map, so the
+        map may only be used until the lock is released.
+        """
+        if self.mapped is None or self.mapped_size < end:
+            if self.mapped:
+                self.mapped.close()
+            self.mapped = mmap.mmap(self.archive_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.mapped_size = len(self.mapped)
+        return self.mapped
+
+    def get(self, url):
+        """
+        Return the page stored for url, or None
+        """
+        offset = self.offsets.get(url)
+        if offset is None:
+            return None
+        # The slice copies the payload out, so decompression runs unlocked
+        with self.lock:
+            mapped = self.get_mapped(offset + RECORD_HEADER.size)
+            magic, flags, url_length, payload_length, crc, _ = RECORD_HEADER.unpack_from(mapped, offset)
+            start = offset + RECORD_HEADER.size + url_length
+            mapped = self.get_mapped(start + payload_length)
+            payload = mapped[start:start + payload_length]
+        if zlib.crc32(payload) != crc:
+            raise ValueError(f"Corrupt archive record for {url} in {self.path}")
+        data = zlib.decompress(payload) if flags & FLAG_ZLIB else payload
+        return data.decode("utf-8")
+
+    # Same surah-level API as HtmlDirectory
+
+    def surah_ids(self):
+        return sorted(self.surah_urls, key=int)
+
+    def has_surah(self, surah_id):
+        return str(surah_id) in self.surah_urls
+
+    def read_surah(self, surah_id):
+        url = self.surah_urls.get(str(surah_id))
+        return self.get(url) if url else None
+
+    def write_surah(self, surah_id, text, url):
+        return self.put(url, text)
+
+class HtmlDirectory:
+    """
+    The classic html_files/surah_{id}_html.txt layout behind the archive's API
+    """
+    def __init__(self, html_dir="html_files"):
+        self.html_dir = html_dir
+        self.base_dir = os.path.join(html_dir, "..")
+
+    def get_path(self, surah_id):
+        return os.path.join(self.html_dir, f"surah_{surah_id}_html.txt")
+
+    def surah_ids(self):
+        surah_ids = []
+        for html_file_path in glob.glob(os.path.join(self.html_dir, "surah_*_html.txt")):
+            surah_id = os.path.basename(html_file_path).split("_")[1]
+            if surah_id.isdigit():
+                surah_ids.append(surah_id)
+        return sorted(surah_ids, key=int)
+
+    def has_surah(self, surah_id):
+        return os.path.exists(self.get_path(surah_id))
+
+    def read_surah(self, surah_id):
+        if not self.has_surah(surah_id):
+            return None
+        with open(self.get_path(surah_id), "r", encoding="utf-8") as html_file:
+            return html_file.read()
+
+    def write_surah(self, surah_id, text, url=None):
+        if not os.path.exists(self.html_dir):
+            os.makedirs(self.html_dir, exist_ok=True)
+        with open(self.get_path(surah_id), "w", encoding="utf-8") as html_file:
+            html_file.write(text)
+
+    def close(self):
+        pass
+
+def open_html_source(path, read_only=False):
+    """
+    Open an archive file, or a folder of surah_{id}_html.txt files
+    """
+    if os.path.isdir(path) or not path.endswith(".tafr"):
+        return HtmlDirectory(path)
+    return HtmlArchive(path, read_only)
+
+def import_directory(html_dir, archive, base_url):
+    """
+    Copy the surah files of html_dir into the archive, skipping surahs it
+    already has. Records get the URL the page would have been fetched from.
+    """
+    directory = HtmlDirectory(html_dir)
+    imported = 0
+    for surah_id in directory.surah_ids():
+        if archive.has_surah(surah_id):
+            continue
+        url = get_surah_page_url(base_url, surah_id, catalog.get_verse_count(surah_id))
+        archive.write_surah(surah_id, directory.read_surah(surah_id), url)
+        imported += 1
+    return imported
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Single-file indexed archive of fetched tafheem pages")
+    parser.add_argument("--archive", default=DEFAULT_ARCHIVE_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="add the surah files of an html_files folder")
+    import_parser.add_argument("html_dir", nargs="?", default="html_files")
+
+    commands.add_parser("list", help="list the archived URLs")
+
+    get_parser = commands.add_parser("get", help="print a page by URL or surah number")
+    get_parser.add_argument("key")
+
+    export_parser = commands.add_parser("export", help="write the surah pages back out as html_files")
+    export_parser.add_argument("html_dir", nargs="?", default="html_files")
+
+    commands.add_parser("reindex", help="rebuild the index file by scanning the archive")
+
+    args = parser.parse_args()
+
+    if args.command == "reindex" and os.path.exists(args.archive + ".idx"):
+        os.remove(args.archive + ".idx")
+
+    with HtmlArchive(args.archive) as archive:
+        if args.command == "import":
+            # newap owns the site URL (and its TAFHEEM_BASE_URL override)
+            from newap import BASE_URL
+            imported = import_directory(args.html_dir, archive, BASE_URL)
+            print(f"✅ Imported {imported} surahs into {args.archive} ({len(archive)} records)")
+        elif args.command == "list":
+            for url in archive.urls():
+                print(url)
+        elif args.command == "get":
+            page = archive.read_surah(args.key) if args.key.isdigit() else archive.get(args.key)
+            if page is None:
+                print(f"Not found: {args.key}")
+                raise SystemExit(1)
+            print(page)
+        elif args.command == "export":
+            directory = HtmlDirectory(args.html_dir)
+            for surah_id in archive.surah_ids():
+                directory.write_surah(surah_id, archive.read_surah(surah_id))
+            print(f"✅ Exported {len(archive.surah_ids())} surahs to {args.html_dir}")
+        elif args.command == "reindex":
+            print(f"✅ Indexed {len(archive)} records of {args.archive}")
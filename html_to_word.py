@@ -1,5 +1,6 @@
 import os
-import glob
+import time
+import argparse
 from bs4 import BeautifulSoup
 from docx import Document
 from docx.shared import Pt, Inches
@@ -7,16 +8,29 @@ from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 from docx.oxml import parse_xml
 from docx.oxml.ns import nsdecls
 
+from html_archive import HtmlDirectory, open_html_source
+from metrics import run_metrics
+from profiling import SurahProfiler, DEFAULT_PROFILE_DIR
+
 def process_html_to_word(html_file_path):
     # Extract surah_id from filename
     filename = os.path.basename(html_file_path)
     surah_id = filename.split('_')[1]
     
+    return process_surah_to_word(HtmlDirectory(os.path.dirname(html_file_path)), surah_id)
+
+def process_surah_to_word(source, surah_id):
+    """
+    Create the Word document of a surah page from source (an HtmlArchive or
+    HtmlDirectory), saved under word_surahs/ next to the source
+    """
     print(f"Processing Surah {surah_id}...")
+    start = time.perf_counter()
     
-    # Read HTML file
-    with open(html_file_path, 'r', encoding='utf-8') as file:
-        html_content = file.read()
+    # Read HTML
+    html_content = source.read_surah(surah_id)
+    if html_content is None:
+        raise FileNotFoundError(f"no HTML stored for Surah {surah_id}")
     
     # Parse HTML
     soup = BeautifulSoup(html_content, 'html.parser')
@@ -161,7 +175,7 @@ def process_html_to_word(html_file_path):
             p._p.get_or_add_pPr().append(parse_xml(f'<w:bidi {nsdecls("w")} w:val="1"/>'))
     
     # Create output directory structure
-    output_base_dir = os.path.join(os.path.dirname(html_file_path), "..", "word_surahs")
+    output_base_dir = os.path.join(source.base_dir, "word_surahs")
     if not os.path.exists(output_base_dir):
         os.makedirs(output_base_dir)
     
@@ -175,50 +189,53 @@ def process_html_to_word(html_file_path):
     doc.save(output_file)
     print(f"   ↳ Document saved to {output_file}")
     
+    run_metrics.record_duration("docx", time.perf_counter() - start, surah_id)
+    run_metrics.increment("docx_bytes", os.path.getsize(output_file), surah_id)
+    
     return output_file
 
-def process_all_html_files():
-    # Path to the HTML files
-    html_folder = os.path.join("html_files")
-    
-    # Ensure the path exists
-    if not os.path.exists(html_folder):
-        print(f"HTML folder '{html_folder}' not found.")
+def process_all_html_files(profiler=None, html_source="html_files"):
+    # HTML files folder, or a single-file .tafr archive
+    if not os.path.exists(html_source):
+        print(f"HTML source '{html_source}' not found.")
         return
     
-    # Get all HTML files
-    html_files = glob.glob(os.path.join(html_folder, "surah_*_html.txt"))
+    source = open_html_source(html_source)
+    surah_ids = source.surah_ids()
     
-    if not html_files:
-        print(f"No HTML files found in {html_folder}")
+    if not surah_ids:
+        print(f"No HTML files found in {html_source}")
         return
     
-    print(f"Found {len(html_files)} HTML files to process")
+    print(f"Found {len(surah_ids)} HTML files to process")
     
-    # Sort files by surah number
-    def get_surah_number(filepath):
-        filename = os.path.basename(filepath)
-        parts = filename.split('_')
-        if len(parts) >= 2:
-            try:
-                return int(parts[1])
-            except ValueError:
-                return 0
-        return 0
-    
-    html_files.sort(key=get_surah_number)
-    
-    # Process each file
+    # Process each surah, in surah order
     processed_files = []
-    for html_file in html_files:
+    for surah_id in surah_ids:
         try:
-            output_file = process_html_to_word(html_file)
+            if profiler:
+                output_file = profiler.run(int(surah_id), process_surah_to_word, source, surah_id)
+            else:
+                output_file = process_surah_to_word(source, surah_id)
             processed_files.append(output_file)
         except Exception as e:
-            print(f"Error processing {html_file}: {e}")
+            print(f"Error processing Surah {surah_id}: {e}")
+            run_metrics.record_error("docx", surah_id)
+    source.close()
     
     print(f"\n✅ Processing complete! Created {len(processed_files)} Word documents")
     print("Documents saved in the 'word_surahs' directory")
+    run_metrics.write(name="html_to_word")
+    
+    if profiler:
+        profiler.write_summary()
 
 if __name__ == "__main__":
-    process_all_html_files()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Create Word documents directly from surah HTML files")
+    parser.add_argument("--profile", nargs="?", const=DEFAULT_PROFILE_DIR, metavar="DIR",
+                        help=f"profile every surah and write the results to DIR (default: {DEFAULT_PROFILE_DIR})")
+    parser.add_argument("--source", default="html_files",
+                        help="folder of surah HTML files or a .tafr archive (default: html_files)")
+    args = parser.parse_args()
+    
+    process_all_html_files(SurahProfiler(args.profile, label="html_to_word") if args.profile else None, args.source)
\ No newline at end of file
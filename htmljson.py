@@ -1,172 +1,245 @@
 import os
 import json
 import re
+import time
+import argparse
 from bs4 import BeautifulSoup
-import glob
 
-def process_surah_html_to_json(html_file_path):
+from changes import write_manifest, MANIFEST_FILENAME
+from corpus import write_corpus
+from html_archive import HtmlDirectory, open_html_source
+from metrics import run_metrics
+from normalization import add_normalized_fields
+from profiling import SurahProfiler, DEFAULT_PROFILE_DIR
+
+def extract_surah_data(html_content, surah_id, normalize=False):
     """
-    Process a single surah HTML file and save it as a separate JSON file
+    Parse the HTML of a single surah into the surah data structure.
+    Returns None when the page has no content div.
+
+    With normalize=True every verse also gets arabic_normalized,
+    urdu_normalized and tafseer_normalized next to the raw fields. Those
+    are taken with spaces between tags, so words split over tags stay apart.
     """
-    # Extract surah_id from filename
-    filename = os.path.basename(html_file_path)
-    surah_id = filename.split('_')[1]
+    start = time.perf_counter()
+    soup = BeautifulSoup(html_content, 'html.parser')
     
-    print(f"Processing Surah {surah_id}...")
+    # Extract surah title from HTML
+    title = soup.find('title').text.strip() if soup.find('title') else f"Surah {surah_id}"
+    surah_name = title.split(',')[0] if ',' in title else title
     
-    try:
-        with open(html_file_path, "r", encoding="utf-8") as html_file:
-            html_content = html_file.read()
-        
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Extract surah title from HTML
-        title = soup.find('title').text.strip() if soup.find('title') else f"Surah {surah_id}"
-        surah_name = title.split(',')[0] if ',' in title else title
-        
-        content_div = soup.find("div", style="margin:0px auto; max-width:800px; padding:10px;")
-        verses = []
+    content_div = soup.find("div", style="margin:0px auto; max-width:800px; padding:10px;")
+    verses = []
 
-        if not content_div:
-            print(f"   ↳ No content found for Surah {surah_id}")
-            return
+    if not content_div:
+        print(f"   ↳ No content found for Surah {surah_id}")
+        return None
 
-        # Extract Arabic text
-        ar_div = content_div.find("div", class_="ar")
-        arabic_spans = ar_div.find_all("span") if ar_div else []
-        # Remove verse numbers (spans with class="nm")
-        arabic_spans = [span for span in arabic_spans if "nm" not in span.get("class", [])]
-        
-        # Extract Urdu translations
-        ur_div = content_div.find("div", class_="ur")
-        urdu_spans = ur_div.find_all("span") if ur_div else []
-        
-        # Extract Tafseer notes
-        nt_div = content_div.find("div", class_="nt")
-        tafseer_paragraphs = nt_div.find_all("p") if nt_div else []
-        
-        # Debug info about tafseer paragraphs
-        print(f"   ↳ Found {len(tafseer_paragraphs)} tafseer paragraphs")
-        
-        # IMPROVEMENT 1: Enhanced tafseer extraction with better structure handling
-        tafseer_dict = {}
-        for p in tafseer_paragraphs:
-            try:
-                # Extract the full paragraph text first
-                p_text = p.get_text(strip=True)
-                if not p_text:
-                    continue
-                    
-                # Method 1: Look for <n> tag which usually contains the reference number
-                if p.find('n'):
-                    ref_num = p.find('n').get_text(strip=True).replace('-', '').strip()
-                    tafseer_dict[ref_num] = p_text
-                    continue
+    # Extract Arabic text
+    ar_div = content_div.find("div", class_="ar")
+    arabic_spans = ar_div.find_all("span") if ar_div else []
+    # Remove verse numbers (spans with class="nm")
+    arabic_spans = [span for span in arabic_spans if "nm" not in span.get("class", [])]
+    
+    # Extract Urdu translations
+    ur_div = content_div.find("div", class_="ur")
+    urdu_spans = ur_div.find_all("span") if ur_div else []
+    
+    # Extract Tafseer notes
+    nt_div = content_div.find("div", class_="nt")
+    tafseer_paragraphs = nt_div.find_all("p") if nt_div else []
+    
+    # Debug info about tafseer paragraphs
+    print(f"   ↳ Found {len(tafseer_paragraphs)} tafseer paragraphs")
+    
+    # IMPROVEMENT 1: Enhanced tafseer extraction with better structure handling
+    tafseer_dict = {}
+    note_paragraphs = {}
+    for p in tafseer_paragraphs:
+        try:
+            # Extract the full paragraph text first
+            p_text = p.get_text(strip=True)
+            if not p_text:
+                continue
                 
-                # Method 2: Use regex to extract reference number from the beginning of the text
-                # Look for patterns like "1. " or "1 -" at the beginning of paragraphs
-                ref_match = re.match(r'^(\d+)[\.:\-\s]+', p_text)
-                if ref_match:
-                    ref_num = ref_match.group(1)
-                    tafseer_dict[ref_num] = p_text
-                    continue
-                    
-                # Method 3: If a paragraph starts with a number, try that
-                if p_text and p_text[0].isdigit():
-                    num_str = ""
-                    for char in p_text:
-                        if char.isdigit():
-                            num_str += char
-                        else:
-                            break
-                    if num_str:
-                        tafseer_dict[num_str] = p_text
-            except Exception as e:
-                print(f"   ↳ Error parsing tafseer paragraph: {e}")
+            # Method 1: Look for <n> tag which usually contains the reference number
+            if p.find('n'):
+                ref_num = p.find('n').get_text(strip=True).replace('-', '').strip()
+                tafseer_dict[ref_num] = p_text
+                note_paragraphs[ref_num] = p
                 continue
+            
+            # Method 2: Use regex to extract reference number from the beginning of the text
+            # Look for patterns like "1. " or "1 -" at the beginning of paragraphs
+            ref_match = re.match(r'^(\d+)[\.:\-\s]+', p_text)
+            if ref_match:
+                ref_num = ref_match.group(1)
+                tafseer_dict[ref_num] = p_text
+                note_paragraphs[ref_num] = p
+                continue
+                
+            # Method 3: If a paragraph starts with a number, try that
+            if p_text and p_text[0].isdigit():
+                num_str = ""
+                for char in p_text:
+                    if char.isdigit():
+                        num_str += char
+                    else:
+                        break
+                if num_str:
+                    tafseer_dict[num_str] = p_text
+                    note_paragraphs[num_str] = p
+        except Exception as e:
+            print(f"   ↳ Error parsing tafseer paragraph: {e}")
+            continue
+    
+    # Debug info about extracted tafseer
+    print(f"   ↳ Extracted {len(tafseer_dict)} tafseer entries")
+    
+    # Get actual verse count for processing
+    verse_count = len(arabic_spans)
+    print(f"   ↳ Found {verse_count} verses")
+    
+    # Texts taken with spaces between tags, only gathered when normalizing
+    normalize_sources = {"arabic": [], "urdu": [], "tafseer": []}
+    spaced_notes = {}
+    
+    resolve_start = time.perf_counter()
+    for i in range(verse_count):
+        # Extract Arabic text
+        arabic_text = arabic_spans[i].get_text(strip=True) if i < len(arabic_spans) else ""
         
-        # Debug info about extracted tafseer
-        print(f"   ↳ Extracted {len(tafseer_dict)} tafseer entries")
-        
-        # Get actual verse count for processing
-        verse_count = len(arabic_spans)
-        print(f"   ↳ Found {verse_count} verses")
+        # Extract Urdu text and find reference numbers
+        urdu_text = ""
+        tafseer_refs = []
         
-        for i in range(verse_count):
-            # Extract Arabic text
-            arabic_text = arabic_spans[i].get_text(strip=True) if i < len(arabic_spans) else ""
+        if i < len(urdu_spans):
+            # Get the raw HTML to extract references
+            span_html = str(urdu_spans[i])
+            urdu_text = urdu_spans[i].get_text(strip=True)
             
-            # Extract Urdu text and find reference numbers
-            urdu_text = ""
-            tafseer_refs = []
+            # IMPROVEMENT 2: More comprehensive reference extraction
+            # Pattern 1: specific format with surah_id
+            pattern1 = r'[FB]' + surah_id + r'_(\d+)\.html'
+            # Pattern 2: simple number format (common in Surah 3)
+            pattern2 = r'href="(\d+)\.html"'
+            # Pattern 3: direct number links without .html (some surahs)
+            pattern3 = r'href="(\d+)"'
+            # Pattern 4: look for superscript numbers (common pattern)
+            pattern4 = r'<sup>(\d+)</sup>'
             
-            if i < len(urdu_spans):
-                # Get the raw HTML to extract references
-                span_html = str(urdu_spans[i])
-                urdu_text = urdu_spans[i].get_text(strip=True)
-                
-                # IMPROVEMENT 2: More comprehensive reference extraction
-                # Pattern 1: specific format with surah_id
-                pattern1 = r'[FB]' + surah_id + r'_(\d+)\.html'
-                # Pattern 2: simple number format (common in Surah 3)
-                pattern2 = r'href="(\d+)\.html"'
-                # Pattern 3: direct number links without .html (some surahs)
-                pattern3 = r'href="(\d+)"'
-                # Pattern 4: look for superscript numbers (common pattern)
-                pattern4 = r'<sup>(\d+)</sup>'
-                
-                refs1 = re.findall(pattern1, span_html)
-                refs2 = re.findall(pattern2, span_html)
-                refs3 = re.findall(pattern3, span_html)
-                refs4 = re.findall(pattern4, span_html)
-                
-                # Combine references from all patterns
-                tafseer_refs = refs1 + refs2 + refs3 + refs4
-                
-                # Remove duplicates while preserving order
-                seen = set()
-                tafseer_refs = [x for x in tafseer_refs if not (x in seen or seen.add(x))]
+            refs1 = re.findall(pattern1, span_html)
+            refs2 = re.findall(pattern2, span_html)
+            refs3 = re.findall(pattern3, span_html)
+            refs4 = re.findall(pattern4, span_html)
             
-            # Collect all referenced tafseer notes for this verse
-            verse_tafseer = ""
+            # Combine references from all patterns
+            tafseer_refs = refs1 + refs2 + refs3 + refs4
             
-            # IMPROVEMENT 3: More robust tafseer matching
-            for ref in tafseer_refs:
-                if ref in tafseer_dict:
+            # Remove duplicates while preserving order
+            seen = set()
+            tafseer_refs = [x for x in tafseer_refs if not (x in seen or seen.add(x))]
+        
+        # Collect all referenced tafseer notes for this verse
+        verse_tafseer = ""
+        verse_note_keys = []
+        
+        # IMPROVEMENT 3: More robust tafseer matching
+        for ref in tafseer_refs:
+            if ref in tafseer_dict:
+                if verse_tafseer:
+                    verse_tafseer += "\n\n"
+                verse_tafseer += tafseer_dict[ref]
+                verse_note_keys.append(ref)
+            else:
+                # Try matching with different formats (some references might be padded with zeros)
+                ref_int = int(ref) if ref.isdigit() else 0
+                ref_str = str(ref_int)
+                if ref_str in tafseer_dict:
                     if verse_tafseer:
                         verse_tafseer += "\n\n"
-                    verse_tafseer += tafseer_dict[ref]
-                else:
-                    # Try matching with different formats (some references might be padded with zeros)
-                    ref_int = int(ref) if ref.isdigit() else 0
-                    ref_str = str(ref_int)
-                    if ref_str in tafseer_dict:
-                        if verse_tafseer:
-                            verse_tafseer += "\n\n"
-                        verse_tafseer += tafseer_dict[ref_str]
-            
-            # IMPROVEMENT 4: Ensure consistent structure for all verses
-            verse_data = {
-                "verse_number": i + 1,
-                "arabic": arabic_text,
-                "urdu": urdu_text,
-                "tafseer": verse_tafseer,
-                "tafseer_refs": tafseer_refs
-            }
-            verses.append(verse_data)
-
-        # Create surah data structure
-        surah_data = {
-            "surah_id": surah_id,
-            "surah_name": surah_name,
-            "total_verses": verse_count,
-            "verses": verses
+                    verse_tafseer += tafseer_dict[ref_str]
+                    verse_note_keys.append(ref_str)
+        
+        # IMPROVEMENT 4: Ensure consistent structure for all verses
+        verse_data = {
+            "verse_number": i + 1,
+            "arabic": arabic_text,
+            "urdu": urdu_text,
+            "tafseer": verse_tafseer,
+            "tafseer_refs": tafseer_refs
         }
+        verses.append(verse_data)
+        
+        if normalize:
+            normalize_sources["arabic"].append(arabic_spans[i].get_text(" ", strip=True))
+            normalize_sources["urdu"].append(urdu_spans[i].get_text(" ", strip=True) if i < len(urdu_spans) else "")
+            for key in verse_note_keys:
+                if key not in spaced_notes:
+                    spaced_notes[key] = note_paragraphs[key].get_text(" ", strip=True)
+            normalize_sources["tafseer"].append("\n\n".join(spaced_notes[key] for key in verse_note_keys))
+
+    # Reference resolution is timed on its own as well as being part of parse
+    run_metrics.record_duration("resolve_refs", time.perf_counter() - resolve_start, surah_id)
+    
+    if normalize:
+        with run_metrics.stage("normalize", surah_id):
+            add_normalized_fields(verses, normalize_sources)
+
+    # Create surah data structure
+    surah_data = {
+        "surah_id": surah_id,
+        "surah_name": surah_name,
+        "total_verses": verse_count,
+        "verses": verses,
+        # Every note once, including notes no verse links to
+        "tafseer_notes": tafseer_dict
+    }
+
+    run_metrics.record_duration("parse", time.perf_counter() - start, surah_id)
+    run_metrics.increment("verses", verse_count, surah_id)
+    run_metrics.increment("notes", len(tafseer_dict), surah_id)
+    run_metrics.increment("unresolved_refs", sum(
+        1 for v in verses for ref in v["tafseer_refs"]
+        if ref not in tafseer_dict and str(int(ref)) not in tafseer_dict
+    ), surah_id)
+    return surah_data
+
+def process_surah_html_to_json(html_file_path, json_dir=".", normalize=False):
+    """
+    Process a single surah HTML file and save it as a separate JSON file in json_dir
+    """
+    # Extract surah_id from filename
+    filename = os.path.basename(html_file_path)
+    surah_id = filename.split('_')[1]
+    
+    return process_surah_to_json(HtmlDirectory(os.path.dirname(html_file_path)), surah_id, json_dir, normalize)
+
+def process_surah_to_json(source, surah_id, json_dir=".", normalize=False):
+    """
+    Process a surah page from source (an HtmlArchive or HtmlDirectory) and
+    save it as a separate JSON file in json_dir
+    """
+    print(f"Processing Surah {surah_id}...")
+    
+    try:
+        html_content = source.read_surah(surah_id)
+        if html_content is None:
+            raise FileNotFoundError(f"no HTML stored for Surah {surah_id}")
+        
+        surah_data = extract_surah_data(html_content, surah_id, normalize)
+        if not surah_data:
+            return None
+        verses = surah_data["verses"]
+        verse_count = surah_data["total_verses"]
 
         # Save to JSON file
-        json_filename = f"surah_{surah_id}.json"
+        json_filename = os.path.join(json_dir, f"surah_{surah_id}.json")
+        write_start = time.perf_counter()
         with open(json_filename, "w", encoding="utf-8") as json_file:
             json.dump(surah_data, json_file, ensure_ascii=False, indent=2)
+        run_metrics.record_duration("json_write", time.perf_counter() - write_start, surah_id)
+        run_metrics.increment("json_bytes", os.path.getsize(json_filename), surah_id)
         
         print(f"   ↳ Saved to {json_filename}")
         
@@ -180,52 +253,65 @@ def process_surah_html_to_json(html_file_path):
         
     except Exception as e:
         print(f"Error processing surah {surah_id}: {e}")
+        run_metrics.record_error("parse", surah_id)
         return None
 
-def process_all_surahs():
+def process_all_surahs(profiler=None, normalize=False, html_source="html_files"):
     """
-    Process all surah HTML files and save each as a separate JSON file
+    Process all surah HTML files and save each as a separate JSON file.
+    html_source is the html_files folder or a .tafr archive file.
+    With a SurahProfiler each surah is processed under cProfile and tracemalloc.
     """
     # Create directory for JSON files if it doesn't exist
     if not os.path.exists("json_files"):
         os.makedirs("json_files")
     
-    # Get list of all HTML files
-    html_files = glob.glob(os.path.join("html_files", "surah_*_html.txt"))
+    # Surah pages come from html_files/ or a single-file archive
+    source = open_html_source(html_source)
+    surah_ids = source.surah_ids()
     
-    print(f"Found {len(html_files)} HTML files to process")
+    print(f"Found {len(surah_ids)} HTML files to process")
     
-    if len(html_files) == 0:
-        print("No HTML files found. Make sure the files exist in the html_files directory.")
+    if len(surah_ids) == 0:
+        print(f"No HTML files found. Make sure the files exist in {html_source}.")
         return
     
-    # Sort files by surah number
-    def get_surah_number(filepath):
-        filename = os.path.basename(filepath)
-        parts = filename.split('_')
-        if len(parts) >= 2:
-            try:
-                return int(parts[1])
-            except ValueError:
-                return 0
-        return 0
-    
-    html_files.sort(key=get_surah_number)
-    
-    # Process each file
+    # Process each surah, in surah order
     all_surahs_data = []
     
-    for html_file in html_files:
-        surah_data = process_surah_html_to_json(html_file)
+    for surah_id in surah_ids:
+        if profiler:
+            surah_data = profiler.run(int(surah_id), process_surah_to_json, source, surah_id, normalize=normalize)
+        else:
+            surah_data = process_surah_to_json(source, surah_id, normalize=normalize)
         if surah_data:
             all_surahs_data.append(surah_data)
+    source.close()
     
     # Also save a complete collection in one file
-    with open("all_surahs.json", "w", encoding="utf-8") as f:
-        json.dump(all_surahs_data, f, ensure_ascii=False, indent=2)
+    # with an offset index, so readers can load one surah without the rest
+    write_corpus(all_surahs_data, "all_surahs.json")
     
     print(f"✅ Processing complete. Created {len(all_surahs_data)} individual JSON files")
     print(f"✅ Also saved all surahs to all_surahs.json")
+    
+    # Per-verse and per-note hashes, so the next crawl can be diffed against this one
+    write_manifest(all_surahs_data, MANIFEST_FILENAME)
+    print(f"✅ Saved content hashes to {MANIFEST_FILENAME}")
+    run_metrics.write(name="htmljson")
+    
+    if profiler:
+        profiler.write_summary()
 
 if __name__ == "__main__":
-    process_all_surahs()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Convert surah HTML files to JSON")
+    parser.add_argument("--profile", nargs="?", const=DEFAULT_PROFILE_DIR, metavar="DIR",
+                        help=f"profile every surah and write the results to DIR (default: {DEFAULT_PROFILE_DIR})")
+    parser.add_argument("--normalize", action="store_true",
+                        help="also store normalized arabic, urdu and tafseer text next to the raw fields")
+    parser.add_argument("--source", default="html_files",
+                        help="folder of surah HTML files or a .tafr archive (default: html_files)")
+    args = parser.parse_args()
+    
+    process_all_surahs(SurahProfiler(args.profile, label="htmljson") if args.profile else None, args.normalize,
+                       args.source)
\ No newline at end of file
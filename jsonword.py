@@ -2,12 +2,125 @@ import json
 from docx import Document
 from docx.shared import Pt, Inches
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
-from docx.oxml import parse_xml
-from docx.oxml.ns import nsdecls
+from docx.opc.constants import CONTENT_TYPE as CT, RELATIONSHIP_TYPE as RT
+from docx.opc.packuri import PackURI
+from docx.opc.part import XmlPart
+from docx.oxml import parse_xml, OxmlElement
+from docx.oxml.ns import nsdecls, qn
+import argparse
 import os
 import glob
+import re
+import time
 
-def create_quran_word_document(json_file_path):
+from corpus import get_tafseer_notes
+from metrics import run_metrics
+from profiling import SurahProfiler, DEFAULT_PROFILE_DIR
+
+URDU_FONT = 'Jameel Noori Nastaleeq'
+
+def get_ref_sort_key(ref):
+    return (0, int(ref), "") if ref.isdigit() else (1, 0, ref)
+
+def get_or_add_footnotes_part(doc):
+    """
+    Return the <w:footnotes> element of the document, creating the part if needed
+    """
+    for rel in doc.part.rels.values():
+        if rel.reltype == RT.FOOTNOTES and isinstance(rel.target_part, XmlPart):
+            return rel.target_part.element
+    
+    # Word expects the separator footnotes (ids -1 and 0) to always be present
+    footnotes = parse_xml(
+        f'<w:footnotes {nsdecls("w")}>'
+        '<w:footnote w:type="separator" w:id="-1"><w:p>'
+        '<w:pPr><w:spacing w:after="0" w:line="240" w:lineRule="auto"/></w:pPr>'
+        '<w:r><w:separator/></w:r></w:p></w:footnote>'
+        '<w:footnote w:type="continuationSeparator" w:id="0"><w:p>'
+        '<w:pPr><w:spacing w:after="0" w:line="240" w:lineRule="auto"/></w:pPr>'
+        '<w:r><w:continuationSeparator/></w:r></w:p></w:footnote>'
+        '</w:footnotes>'
+    )
+    footnotes_part = XmlPart(PackURI('/word/footnotes.xml'), CT.WML_FOOTNOTES, footnotes, doc.part.package)
+    doc.part.relate_to(footnotes_part, RT.FOOTNOTES)
+    return footnotes
+
+def add_footnote(footnotes, footnote_id, ref, text):
+    """
+    Append a right-to-left footnote whose mark is the original ref number
+    """
+    footnote = OxmlElement('w:footnote')
+    footnote.set(qn('w:id'), str(footnote_id))
+    p = OxmlElement('w:p')
+    p.append(parse_xml(f'<w:pPr {nsdecls("w")}><w:bidi w:val="1"/><w:jc w:val="right"/></w:pPr>'))
+    
+    # Custom mark so the footnote keeps the tafseer's own numbering
+    mark_run = OxmlElement('w:r')
+    mark_run.append(parse_xml(f'<w:rPr {nsdecls("w")}><w:vertAlign w:val="superscript"/></w:rPr>'))
+    mark_text = OxmlElement('w:t')
+    mark_text.text = ref
+    mark_run.append(mark_text)
+    p.append(mark_run)
+    
+    text_run = OxmlElement('w:r')
+    text_run.append(parse_xml(
+        f'<w:rPr {nsdecls("w")}><w:rFonts w:ascii="{URDU_FONT}" w:hAnsi="{URDU_FONT}" w:cs="{URDU_FONT}"/>'
+        '<w:sz w:val="24"/><w:szCs w:val="24"/><w:rtl/></w:rPr>'
+    ))
+    note_text = OxmlElement('w:t')
+    note_text.set(qn('xml:space'), 'preserve')
+    note_text.text = f" {text}"
+    text_run.append(note_text)
+    p.append(text_run)
+    
+    footnote.append(p)
+    footnotes.append(footnote)
+
+def add_footnote_reference(paragraph, footnote_id, ref):
+    """
+    Add a superscript footnote reference run showing the original ref number
+    """
+    run = paragraph.add_run()
+    run.font.superscript = True
+    run.font.size = Pt(14)
+    run.font.name = URDU_FONT
+    
+    reference = OxmlElement('w:footnoteReference')
+    reference.set(qn('w:customMarkFollows'), '1')
+    reference.set(qn('w:id'), str(footnote_id))
+    run._r.append(reference)
+    
+    mark_text = OxmlElement('w:t')
+    mark_text.text = ref
+    run._r.append(mark_text)
+
+def add_ref_mark(paragraph, ref):
+    """
+    Add the ref number as plain superscript, for a note footnoted elsewhere
+    """
+    run = paragraph.add_run(ref)
+    run.font.superscript = True
+    run.font.size = Pt(14)
+    run.font.name = URDU_FONT
+    return run
+
+def add_urdu_run(paragraph, text):
+    run = paragraph.add_run(text)
+    run.font.size = Pt(14)
+    run.font.name = URDU_FONT
+    return run
+
+def create_quran_word_document(json_file_path, footnotes=False, output_dir=None):
+    """
+    Render a surah JSON file to Word, by default into word_files/ next to
+    the JSON folder.
+
+    With `footnotes=True` the tafseer notes become real Word footnotes
+    anchored at the reference numbers inside the Urdu translation instead
+    of a separate notes section at the end of the document.
+    """
+    start = time.perf_counter()
+    
     # Load JSON data
     with open(json_file_path, 'r', encoding='utf-8') as file:
         surah_data = json.load(file)
@@ -61,10 +174,16 @@ def create_quran_word_document(json_file_path):
     # Add a separator
     doc.add_paragraph().add_run('_' * 80).font.size = Pt(10)
     
+    # Resolve every ref to its own note text once, up front
+    tafseer_index = get_tafseer_notes(surah_data)
+    
     # SECTION 2: Add translations with reference numbers
     translation_heading = doc.add_heading('Urdu Translation', level=2)
     translation_heading.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
     
+    footnotes_element = get_or_add_footnotes_part(doc) if footnotes else None
+    footnoted_refs = set()
+    
     for verse in surah_data['verses']:
         # Check if verse has content
         if 'urdu' not in verse or not verse['urdu']:
@@ -73,54 +192,78 @@ def create_quran_word_document(json_file_path):
         p = doc.add_paragraph()
         p.alignment = WD_PARAGRAPH_ALIGNMENT.RIGHT
         
-        # Add verse number with translation
-        trans_run = p.add_run(f"{verse['verse_number']}- {verse['urdu']}")
-        trans_run.font.size = Pt(14)
-        trans_run.font.name = 'Jameel Noori Nastaleeq'
+        urdu_text = f"{verse['verse_number']}- {verse['urdu']}"
+        if not footnotes:
+            # Add verse number with translation
+            add_urdu_run(p, urdu_text)
+        else:
+            # The ref numbers survive in the extracted Urdu text where the links
+            # were, so each one is replaced in place by a footnote reference
+            position = len(f"{verse['verse_number']}- ")
+            trailing_refs = []
+            for ref in verse.get('tafseer_refs') or []:
+                if ref not in tafseer_index:
+                    continue
+                ref_match = re.compile(r'(?<!\d)' + re.escape(ref) + r'(?!\d)').search(urdu_text, position)
+                if ref in footnoted_refs:
+                    # The note is already a footnote of an earlier verse, so the
+                    # ref only gets a superscript mark instead of a second reference
+                    if ref_match:
+                        add_urdu_run(p, urdu_text[:ref_match.start()])
+                        add_ref_mark(p, ref)
+                        urdu_text = urdu_text[ref_match.end():]
+                        position = 0
+                    continue
+                footnoted_refs.add(ref)
+                footnote_id = len(footnoted_refs)
+                # The mark already shows the number, so drop it from the note body
+                note_text = re.sub(r'^\d+[\s\.:\-]*', '', tafseer_index[ref])
+                add_footnote(footnotes_element, footnote_id, ref, note_text)
+                
+                if not ref_match:
+                    trailing_refs.append((footnote_id, ref))
+                    continue
+                add_urdu_run(p, urdu_text[:ref_match.start()])
+                add_footnote_reference(p, footnote_id, ref)
+                urdu_text = urdu_text[ref_match.end():]
+                position = 0
+            
+            add_urdu_run(p, urdu_text)
+            for footnote_id, ref in trailing_refs:
+                add_footnote_reference(p, footnote_id, ref)
         
         # Set RTL direction - compatible way
         p._p.get_or_add_pPr().append(parse_xml(f'<w:bidi {nsdecls("w")} w:val="1"/>'))
     
-    # Add a separator
-    doc.add_paragraph().add_run('_' * 80).font.size = Pt(10)
-    
-    # SECTION 3: Add tafseer by reference numbers
-    tafseer_heading = doc.add_heading('Tafseer (Notes)', level=2)
-    tafseer_heading.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-    
-    # Create a dictionary to store unique tafseer notes
-    unique_tafseer = {}
-    
-    for verse in surah_data['verses']:
-        # Check if verse has tafseer content
-        if 'tafseer' in verse and verse['tafseer'] and 'tafseer_refs' in verse and verse['tafseer_refs']:
-            # Each verse may have multiple refs to the same tafseer
-            for ref in verse['tafseer_refs']:
-                # Only add unique tafseer entries
-                if ref not in unique_tafseer:
-                    unique_tafseer[ref] = verse['tafseer']
-    
-    # Now add all unique tafseer notes in order
-    for ref in sorted(unique_tafseer.keys(), key=lambda x: int(x) if x.isdigit() else x):
-        p = doc.add_paragraph()
-        p.alignment = WD_PARAGRAPH_ALIGNMENT.RIGHT
+    if not footnotes:
+        # Add a separator
+        doc.add_paragraph().add_run('_' * 80).font.size = Pt(10)
         
-        # Add tafseer reference number and content
-        tafseer_run = p.add_run(f"حاشیہ نمبر {ref}: ")
-        tafseer_run.font.size = Pt(12)
-        tafseer_run.font.name = 'Jameel Noori Nastaleeq'
-        tafseer_run.bold = True
+        # SECTION 3: Add tafseer by reference numbers
+        tafseer_heading = doc.add_heading('Tafseer (Notes)', level=2)
+        tafseer_heading.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
         
-        # Add the actual tafseer text
-        tafseer_text = p.add_run(unique_tafseer[ref])
-        tafseer_text.font.size = Pt(12)
-        tafseer_text.font.name = 'Jameel Noori Nastaleeq'
-        
-        # Set RTL direction - compatible way
-        p._p.get_or_add_pPr().append(parse_xml(f'<w:bidi {nsdecls("w")} w:val="1"/>'))
+        # Now add all unique tafseer notes in order
+        for ref in sorted(tafseer_index.keys(), key=get_ref_sort_key):
+            p = doc.add_paragraph()
+            p.alignment = WD_PARAGRAPH_ALIGNMENT.RIGHT
+            
+            # Add tafseer reference number and content
+            tafseer_run = p.add_run(f"حاشیہ نمبر {ref}: ")
+            tafseer_run.font.size = Pt(12)
+            tafseer_run.font.name = URDU_FONT
+            tafseer_run.bold = True
+            
+            # Add the actual tafseer text
+            tafseer_text = p.add_run(tafseer_index[ref])
+            tafseer_text.font.size = Pt(12)
+            tafseer_text.font.name = URDU_FONT
+            
+            # Set RTL direction - compatible way
+            p._p.get_or_add_pPr().append(parse_xml(f'<w:bidi {nsdecls("w")} w:val="1"/>'))
     
     # Save the document
-    output_dir = os.path.join(os.path.dirname(json_file_path), "..", "word_files")
+    output_dir = output_dir or os.path.join(os.path.dirname(json_file_path), "..", "word_files")
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
     
@@ -131,11 +274,25 @@ def create_quran_word_document(json_file_path):
     doc.save(output_file)
     print(f"Document saved as {output_file}")
     
+    surah_id = surah_data.get('surah_id')
+    run_metrics.record_duration("docx", time.perf_counter() - start, surah_id)
+    run_metrics.increment("docx_bytes", os.path.getsize(output_file), surah_id)
+    run_metrics.increment("docx_notes", len(tafseer_index), surah_id)
+    
     return output_file
 
 if __name__ == "__main__":
-    # Use raw string literal for the path to avoid backslash issues
-    json_folder = r"d:\pixelpk projects\shamilaurdu-scrapper\jsons_ready"
+    parser = argparse.ArgumentParser(description="Create Word documents from surah JSON files")
+    parser.add_argument("json_folder", nargs="?", default="jsons_ready",
+                        help="folder with the surah_{id}.json files (default: jsons_ready)")
+    parser.add_argument("--footnotes", action="store_true",
+                        help="render tafseer notes as Word footnotes at the Urdu reference positions")
+    parser.add_argument("--profile", nargs="?", const=DEFAULT_PROFILE_DIR, metavar="DIR",
+                        help=f"profile every surah and write the results to DIR (default: {DEFAULT_PROFILE_DIR})")
+    args = parser.parse_args()
+    profiler = SurahProfiler(args.profile, label="jsonword") if args.profile else None
+    
+    json_folder = args.json_folder
     
     # Get all JSON files in the folder
     json_files = glob.glob(os.path.join(json_folder, "*.json"))
@@ -154,10 +311,19 @@ if __name__ == "__main__":
     for json_file in json_files:
         print(f"Processing {os.path.basename(json_file)}...")
         try:
-            output_file = create_quran_word_document(json_file)
+            if profiler:
+                surah_id = os.path.basename(json_file).split("_")[1].split(".")[0]
+                output_file = profiler.run(surah_id, create_quran_word_document, json_file, footnotes=args.footnotes)
+            else:
+                output_file = create_quran_word_document(json_file, footnotes=args.footnotes)
             processed_files.append(output_file)
         except Exception as e:
             print(f"Error processing {json_file}: {e}")
+            run_metrics.record_error("docx", os.path.basename(json_file).split("_")[1].split(".")[0])
     
     print(f"\nProcessing complete! Created {len(processed_files)} Word documents")
-    print("Documents saved in the 'word_files' directory")
\ No newline at end of file
+    print("Documents saved in the 'word_files' directory")
+    run_metrics.write(name="jsonword")
+    
+    if profiler:
+        profiler.write_summary()
\ No newline at end of file
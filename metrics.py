@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+# Where run reports go, override with TAFHEEM_METRICS_DIR
+METRICS_DIR = os.environ.get("TAFHEEM_METRICS_DIR", "metrics")
+METRIC_PREFIX = "tafheem"
+
+class RunMetrics:
+    """
+    Per-stage timings and counters for one pipeline run.
+
+    Stages are fetch_index, fetch, parse, resolve_refs, json_write and
+    docx. Every duration and counter is kept both as a run total and per
+    surah, so slow or failing surahs can be picked out of the report.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started_at = time.time()
+            self.stages = {}
+            self.counters = {}
+            self.surahs = {}
+
+    def get_surah(self, surah_id):
+        # Caller holds the lock
+        return self.surahs.setdefault(str(surah_id), {"stages": {}, "counters": {}})
+
+    @contextmanager
+    def stage(self, name, surah_id=None):
+        """
+        Time the block as one run of a stage, counting an error if it raises
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.record_error(name, surah_id)
+            raise
+        finally:
+            self.record_duration(name, time.perf_counter() - start, surah_id)
+
+    def record_duration(self, name, seconds, surah_id=None):
+        with self.lock:
+            stage = self.stages.setdefault(name, {"runs": 0, "seconds_total": 0.0, "seconds_max": 0.0, "errors": 0})
+            stage["runs"] += 1
+            stage["seconds_total"] += seconds
+            stage["seconds_max"] = max(stage["seconds_max"], seconds)
+            if surah_id is not None:
+                surah_stages = self.get_surah(surah_id)["stages"]
+                surah_stages[name] = surah_stages.get(name, 0.0) + seconds
+
+    def record_error(self, name, surah_id=None):
+        with self.lock:
+            stage = self.stages.setdefault(name, {"runs": 0, "seconds_total": 0.0, "seconds_max": 0.0, "errors": 0})
+            stage["errors"] += 1
+        self.increment("errors", 1, surah_id)
+
+    def increment(self, name, amount=1, surah_id=None):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+            if surah_id is not None:
+                surah_counters = self.get_surah(surah_id)["counters"]
+                surah_counters[name] = surah_counters.get(name, 0) + amount
+
+    def merge(self, report):
+        """
+        Add the stages and counters of a report recorded elsewhere, e.g. by
+        a worker process, to this run
+        """
+        with self.lock:
+            for name, other in report["stages"].items():
+                stage = self.stages.setdefault(name, {"runs": 0, "seconds_total": 0.0, "seconds_max": 0.0, "errors": 0})
+                stage["runs"] += other["runs"]
+                stage["seconds_total"] += other["seconds_total"]
+                stage["seconds_max"] = max(stage["seconds_max"], other["seconds_max"])
+                stage["errors"] += other["errors"]
+            for name, value in report["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            for surah_id, other in report["surahs"].items():
+                surah = self.get_surah(surah_id)
+                for kind in ("stages", "counters"):
+                    for name, value in other[kind].items():
+                        surah[kind][name] = surah[kind].get(name, 0) + value
+
+    def to_report(self):
+        """
+        Return the run as a JSON-serialisable dict
+        """
+        with self.lock:
+            finished_at = time.time()
+            return {
+                "started_at": self.started_at,
+                "finished_at": finished_at,
+                "duration_seconds": finished_at - self.started_at,
+                "stages": json.loads(json.dumps(self.stages)),
+                "counters": dict(self.counters),
+                "surahs": json.loads(json.dumps(self.surahs)),
+            }
+
+    def to_prometheus(self, run_name="run"):
+        """
+        Render the run in the Prometheus text exposition format.
+        Every sample carries a run label so several scripts can share one
+        textfile collector directory without clashing series.
+        """
+        report = self.to_report()
+        lines = []
+
+        def add_metric(name, metric_type, help_text, samples):
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} {metric_type}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{label}"' for key, label in {"run": run_name, **labels}.items())
+                lines.append(f"{METRIC_PREFIX}_{name}{{{label_text}}} {value}")
+
+        add_metric("run_started_timestamp_seconds", "gauge", "Unix time the run started",
+                   [({}, report["started_at"])])
+        add_metric("run_duration_seconds", "gauge", "Wall time of the run",
+                   [({}, report["duration_seconds"])])
+
+        stages = sorted(report["stages"].items())
+        add_metric("stage_duration_seconds_total", "counter", "Total time spent in each stage",
+                   [({"stage": name}, stage["seconds_total"]) for name, stage in stages])
+        add_metric("stage_duration_seconds_max", "gauge", "Slowest single run of each stage",
+                   [({"stage": name}, stage["seconds_max"]) for name, stage in stages])
+        add_metric("stage_runs_total", "counter", "Number of runs of each stage",
+                   [({"stage": name}, stage["runs"]) for name, stage in stages])
+        add_metric("stage_errors_total", "counter", "Number of failed runs of each stage",
+                   [({"stage": name}, stage["errors"]) for name, stage in stages])
+
+        for name, value in sorted(report["counters"].items()):
+            add_metric(f"{name}_total", "counter", f"Total {name.replace('_', ' ')} in the run", [({}, value)])
+
+        surahs = sorted(report["surahs"].items(), key=lambda item: int(item[0]) if item[0].isdigit() else 0)
+        add_metric("surah_stage_duration_seconds", "gauge", "Time spent in each stage per surah",
+                   [({"surah": surah_id, "stage": name}, seconds)
+                    for surah_id, surah in surahs for name, seconds in sorted(surah["stages"].items())])
+        add_metric("surah_count", "gauge", "Counters per surah",
+                   [({"surah": surah_id, "name": name}, value)
+                    for surah_id, surah in surahs for name, value in sorted(surah["counters"].items())])
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, output_dir=None, name="run"):
+        """
+        Write {name}_report.json and {name}.prom into output_dir.
+        Files are renamed into place so a textfile collector never reads half a file.
+        """
+        output_dir = output_dir or METRICS_DIR
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+
+        report_path = os.path.join(output_dir, f"{name}_report.json")
+        prometheus_path = os.path.join(output_dir, f"{name}.prom")
+        for path, content in ((report_path, json.dumps(self.to_report(), indent=2)),
+                              (prometheus_path, self.to_prometheus(name))):
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(path + ".tmp", path)
+
+        print(f"✅ Metrics saved to {report_path} and {prometheus_path}")
+        return report_path, prometheus_path
+
+# Shared by every stage of the current process
+run_metrics = RunMetrics()
@@ -0,0 +1,209 @@
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import catalog
+import fixtures
+
+# Same path layout as the real site so only the host part of BASE_URL changes
+PAGE_PREFIX = "/islamikitabein/"
+NOTE_PAGE_PATTERN = re.compile(r'^[FB](\d+)_(\d+)\.html$')
+
+class MockSettings:
+    """
+    Failure and throttling knobs of the mock server
+    """
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0,
+                 max_requests_per_second=0, bandwidth=0, notes_per_verse=1.2, seed=None):
+        self.latency = latency                      # seconds added to every response
+        self.jitter = jitter                        # extra random delay of up to this many seconds
+        self.error_rate = error_rate                # share of requests answered with a 500/503
+        self.throttle_rate = throttle_rate          # share of requests answered with a 429
+        self.max_requests_per_second = max_requests_per_second  # 429 above this rate, 0 = unlimited
+        self.bandwidth = bandwidth                  # bytes per second per response, 0 = unlimited
+        self.notes_per_verse = notes_per_verse
+        self.rng = random.Random(seed)
+
+@lru_cache(maxsize=None)
+def get_surah_verses(surah_id, notes_per_verse):
+    return fixtures.generate_surah_verses(surah_id, catalog.get_verse_count(surah_id), notes_per_verse)
+
+def find_note(surah_id, note_number, notes_per_verse):
+    for verse in get_surah_verses(surah_id, notes_per_verse):
+        for note in verse["notes"]:
+            if note["number"] == note_number:
+                return note
+    return None
+
+class MockTafheemHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        # Keep load tests quiet, the stats endpoint has the numbers
+        pass
+
+    def do_GET(self):
+        server = self.server
+        settings = server.settings
+        url = urlsplit(self.path)
+        if url.path == "/__stats":
+            return self.send_body(200, json.dumps(server.get_stats()), "application/json")
+
+        server.record("requests")
+        delay = settings.latency + (settings.rng.uniform(0, settings.jitter) if settings.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+        if settings.max_requests_per_second and not server.take_token():
+            return self.send_throttled()
+        if settings.throttle_rate and settings.rng.random() < settings.throttle_rate:
+            return self.send_throttled()
+        if settings.error_rate and settings.rng.random() < settings.error_rate:
+            return self.send_body(settings.rng.choice([500, 503]), "Internal Server Error")
+
+        status, body = self.render_page(url)
+        self.send_body(status, body)
+
+    def render_page(self, url):
+        settings = self.server.settings
+        if not url.path.startswith(PAGE_PREFIX):
+            return 404, "Not Found"
+        page = url.path[len(PAGE_PREFIX):]
+        query = parse_qs(url.query)
+
+        if page == "urduref.php":
+            surah_id = query.get("sura", [None])[0]
+            if surah_id is None:
+                return 200, fixtures.render_surah_list_html(range(1, catalog.TOTAL_SURAHS + 1))
+            if not surah_id.isdigit() or not catalog.get_verse_count(surah_id):
+                return 404, "Not Found"
+            verse_count = catalog.get_verse_count(surah_id)
+
+            verse_range = query.get("verse", [None])[0]
+            if verse_range is None:
+                return 200, fixtures.render_surah_index_html(surah_id, verse_count)
+            try:
+                start, end = (int(part) for part in verse_range.split("-"))
+            except ValueError:
+                return 400, "Bad Request"
+            verses = get_surah_verses(surah_id, settings.notes_per_verse)[max(start, 1) - 1:end]
+            return 200, fixtures.render_surah_html(surah_id, verses)
+
+        note_match = NOTE_PAGE_PATTERN.match(page)
+        if note_match:
+            note = find_note(note_match.group(1), int(note_match.group(2)), settings.notes_per_verse)
+            if note:
+                return 200, fixtures.render_note_html(note_match.group(1), note)
+
+        return 404, "Not Found"
+
+    def send_throttled(self):
+        self.send_body(429, "Too Many Requests", extra_headers={"Retry-After": "1"})
+
+    def send_body(self, status, body, content_type="text/html; charset=utf-8", extra_headers=None):
+        self.server.record(f"status_{status}")
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        bandwidth = self.server.settings.bandwidth
+        if not bandwidth:
+            self.wfile.write(data)
+        else:
+            # Trickle the body out in 1/10 second chunks to cap throughput
+            chunk_size = max(1, bandwidth // 10)
+            for offset in range(0, len(data), chunk_size):
+                self.wfile.write(data[offset:offset + chunk_size])
+                time.sleep(chunk_size / bandwidth)
+        self.server.record("bytes_sent", len(data))
+
+class MockTafheemServer(ThreadingHTTPServer):
+    """
+    Local stand-in for tafheem.net serving generated surah pages.
+
+    Point the crawler at it by setting newap.BASE_URL (or the
+    TAFHEEM_BASE_URL environment variable) to `server.base_url`.
+    """
+    daemon_threads = True
+
+    def __init__(self, settings=None, host="127.0.0.1", port=0):
+        super().__init__((host, port), MockTafheemHandler)
+        self.settings = settings or MockSettings()
+        self.stats = {}
+        self.lock = threading.Lock()
+        self.tokens = float(self.settings.max_requests_per_second)
+        self.last_refill = time.monotonic()
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{PAGE_PREFIX}urduref.php"
+
+    def record(self, key, amount=1):
+        with self.lock:
+            self.stats[key] = self.stats.get(key, 0) + amount
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats)
+
+    def take_token(self):
+        """
+        Token bucket shared by all connections, refilled at max_requests_per_second
+        """
+        rate = self.settings.max_requests_per_second
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(rate, self.tokens + (now - self.last_refill) * rate)
+            self.last_refill = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve generated tafheem pages locally for crawler load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra delay of up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failing with 500/503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--max-rps", type=int, default=0, help="answer 429 above this many requests per second")
+    parser.add_argument("--bandwidth", type=int, default=0, help="bytes per second per response")
+    parser.add_argument("--notes-per-verse", type=float, default=1.2)
+    parser.add_argument("--seed", type=int, default=None, help="seed for the latency and failure draws")
+    args = parser.parse_args()
+
+    settings = MockSettings(args.latency, args.jitter, args.error_rate, args.throttle_rate,
+                            args.max_rps, args.bandwidth, args.notes_per_verse, args.seed)
+    server = MockTafheemServer(settings, args.host, args.port)
+    print(f"⏳ Serving mock tafheem pages at {server.base_url}")
+    print(f"   ↳ export TAFHEEM_BASE_URL={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("✅ Mock server stopped")
@@ -0,0 +1,264 @@
+import re
+import sys
+import json
+import time
+import zlib
+import argparse
+
+from corpus import iter_corpus, get_tafseer_notes
+from normalization import normalize_text
+
+REPORT_FORMAT = "tafheem-near-duplicates-v1"
+REPORT_FILENAME = "near_duplicates.json"
+
+DEFAULT_NUM_PERM = 128
+DEFAULT_BANDS = 32  # 4 rows per band, candidates from about 0.42 similarity up
+DEFAULT_THRESHOLD = 0.5
+DEFAULT_SHINGLE_SIZE = 5
+
+# Spreads the crc32 of a shingle over 64 bits (an odd multiplier is a bijection)
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+HASH_MASK = (1 << 64) - 1
+
+# Leading note number, e.g. "12 - " or "12."
+NOTE_NUMBER_PATTERN = re.compile(r'^\d+\s*[-–:.]?\s*')
+
+def get_shingles(text, shingle_size=DEFAULT_SHINGLE_SIZE):
+    """
+    Character shingles of a note, hashed with crc32. Characters rather than
+    words, as Urdu notes spell the same word with and without spaces.
+
+    The text is encoded once as UTF-16, two bytes per Arabic-script
+    character, and sliced as bytes, which is much cheaper than encoding
+    every shingle on its own.
+    """
+    data = text.encode("utf-16-le")
+    width = 2 * shingle_size
+    if len(data) <= width:
+        return {zlib.crc32(data)} if data else set()
+    return set(map(zlib.crc32, [data[i:i + width] for i in range(0, len(data) - width + 1, 2)]))
+
+def minhash_signature(shingles, num_perm=DEFAULT_NUM_PERM):
+    """
+    One-permutation MinHash: every shingle is hashed once and only competes
+    for the minimum of its own bin, instead of being hashed num_perm times.
+    Empty bins borrow from the next filled one (rotation densification), so
+    the share of equal bins of two signatures estimates their Jaccard
+    similarity like classic MinHash does.
+    """
+    if not shingles:
+        return None
+    empty = HASH_MASK
+    signature = [empty] * num_perm
+    for shingle in shingles:
+        mixed = (shingle * HASH_MULTIPLIER) & HASH_MASK
+        position = mixed % num_perm
+        value = mixed // num_perm
+        if value < signature[position]:
+            signature[position] = value
+
+    offset = HASH_MASK // num_perm + 1
+    if empty in signature:
+        densified = list(signature)
+        for position in range(num_perm):
+            if signature[position] != empty:
+                continue
+            distance = 1
+            while signature[(position + distance) % num_perm] == empty:
+                distance += 1
+            densified[position] = signature[(position + distance) % num_perm] + distance * offset
+        signature = densified
+    return signature
+
+def estimate_similarity(signature, other):
+    return sum(1 for a, b in zip(signature, other) if a == b) / len(signature)
+
+def prepare_note_text(text):
+    """
+    The text a note is compared on: normalized, without its leading number
+    """
+    return NOTE_NUMBER_PATTERN.sub("", normalize_text(text, "tafseer"))
+
+class NearDuplicateIndex:
+    """
+    MinHash signatures of notes, bucketed by locality-sensitive hashing.
+
+    Each signature is cut into bands; notes sharing any whole band land in
+    the same bucket and become candidates. Only candidates are compared, so
+    building and querying stay close to linear in the number of notes.
+    """
+    def __init__(self, num_perm=DEFAULT_NUM_PERM, bands=DEFAULT_BANDS, shingle_size=DEFAULT_SHINGLE_SIZE):
+        if num_perm % bands:
+            raise ValueError(f"bands ({bands}) must divide num_perm ({num_perm})")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.signatures = {}
+        self.buckets = [{} for _ in range(bands)]
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def signature_of(self, text):
+        return minhash_signature(get_shingles(prepare_note_text(text), self.shingle_size), self.num_perm)
+
+    def band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, tuple(signature[band * self.rows:(band + 1) * self.rows])
+
+    def add(self, key, text):
+        signature = self.signature_of(text)
+        if signature is None:
+            return False
+        self.signatures[key] = signature
+        for band, band_key in self.band_keys(signature):
+            self.buckets[band].setdefault(band_key, []).append(key)
+        return True
+
+    def candidates(self, signature):
+        found = set()
+        for band, band_key in self.band_keys(signature):
+            found.update(self.buckets[band].get(band_key, ()))
+        return found
+
+    def query(self, text, threshold=DEFAULT_THRESHOLD):
+        """
+        Return [(key, similarity)] of indexed notes similar to text, most similar first
+        """
+        signature = self.signature_of(text)
+        if signature is None:
+            return []
+        return self.rank(signature, self.candidates(signature), threshold)
+
+    def similar_to(self, key, threshold=DEFAULT_THRESHOLD):
+        """
+        Like query, for a note already in the index
+        """
+        signature = self.signatures[key]
+        return self.rank(signature, self.candidates(signature) - {key}, threshold)
+
+    def rank(self, signature, keys, threshold):
+        matches = []
+        for key in keys:
+            similarity = estimate_similarity(signature, self.signatures[key])
+            if similarity >= threshold:
+                matches.append((key, similarity))
+        return sorted(matches, key=lambda match: (-match[1], match[0]))
+
+    def pairs(self, threshold=DEFAULT_THRESHOLD):
+        """
+        Return every (key, other, similarity) pair at or above threshold
+        """
+        compared = set()
+        found = []
+        for band_buckets in self.buckets:
+            for keys in band_buckets.values():
+                if len(keys) < 2:
+                    continue
+                for i, key in enumerate(keys):
+                    for other in keys[i + 1:]:
+                        pair = (key, other) if key < other else (other, key)
+                        if pair in compared:
+                            continue
+                        compared.add(pair)
+                        similarity = estimate_similarity(self.signatures[key], self.signatures[other])
+                        if similarity >= threshold:
+                            found.append((pair[0], pair[1], similarity))
+        return sorted(found, key=lambda pair: (-pair[2], pair[0], pair[1]))
+
+def get_note_key(surah_id, ref):
+    return f"{surah_id}:{ref}"
+
+def build_index(surahs, num_perm=DEFAULT_NUM_PERM, bands=DEFAULT_BANDS, shingle_size=DEFAULT_SHINGLE_SIZE):
+    """
+    Index every tafseer note of the corpus under "surah:ref"
+    """
+    index = NearDuplicateIndex(num_perm, bands, shingle_size)
+    texts = {}
+    for surah in surahs:
+        for ref, text in get_tafseer_notes(surah).items():
+            key = get_note_key(surah["surah_id"], ref)
+            if index.add(key, text):
+                texts[key] = text
+    return index, texts
+
+def get_note_sort_key(key):
+    surah_id, _, ref = key.partition(":")
+    return (int(surah_id) if surah_id.isdigit() else 0, int(ref) if ref.isdigit() else 0, key)
+
+def get_clusters(pairs):
+    """
+    Group pairs into clusters of notes that are connected by similar pairs
+    """
+    parents = {}
+
+    def find(key):
+        parents.setdefault(key, key)
+        while parents[key] != key:
+            parents[key] = parents[parents[key]]
+            key = parents[key]
+        return key
+
+    best = {}
+    for key, other, similarity in pairs:
+        parents[find(key)] = find(other)
+    for key, other, similarity in pairs:
+        root = find(key)
+        best[root] = max(best.get(root, 0.0), similarity)
+
+    members = {}
+    for key in parents:
+        members.setdefault(find(key), []).append(key)
+    clusters = [{"notes": sorted(keys, key=get_note_sort_key), "size": len(keys), "max_similarity": round(best[root], 3)}
+                for root, keys in members.items()]
+    return sorted(clusters, key=lambda cluster: (-cluster["size"], get_note_sort_key(cluster["notes"][0])))
+
+def build_report(index, threshold=DEFAULT_THRESHOLD):
+    pairs = index.pairs(threshold)
+    return {
+        "format": REPORT_FORMAT,
+        "threshold": threshold,
+        "num_perm": index.num_perm,
+        "bands": index.bands,
+        "shingle_size": index.shingle_size,
+        "notes": len(index),
+        "pairs": [{"notes": [key, other], "similarity": round(similarity, 3)} for key, other, similarity in pairs],
+        "clusters": get_clusters(pairs),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find near-duplicate tafseer notes across the corpus with MinHash/LSH")
+    parser.add_argument("corpus", nargs="?", default="all_surahs.json",
+                        help="all_surahs.json, a surah JSON file or a folder of them")
+    parser.add_argument("-o", "--output", default=REPORT_FILENAME, help="where to write the cluster report")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="minimum estimated similarity")
+    parser.add_argument("--num-perm", type=int, default=DEFAULT_NUM_PERM)
+    parser.add_argument("--bands", type=int, default=DEFAULT_BANDS,
+                        help="more bands find less similar candidates, fewer bands are stricter")
+    parser.add_argument("--shingle-size", type=int, default=DEFAULT_SHINGLE_SIZE)
+    parser.add_argument("--note", help="only list the notes similar to this one, e.g. 2:15")
+    parser.add_argument("--query", help="only list the notes similar to this text")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index, texts = build_index(iter_corpus(args.corpus), args.num_perm, args.bands, args.shingle_size)
+    print(f"Indexed {len(index)} notes in {time.perf_counter() - start:.2f}s")
+
+    if args.note or args.query:
+        if args.note and args.note not in index.signatures:
+            print(f"Note {args.note} not found")
+            sys.exit(1)
+        matches = index.similar_to(args.note, args.threshold) if args.note else index.query(args.query, args.threshold)
+        for key, similarity in matches:
+            print(f"{similarity:.2f}  {key}  {prepare_note_text(texts[key])[:80]}")
+        print(f"{len(matches)} similar notes")
+        sys.exit(0)
+
+    report = build_report(index, args.threshold)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Found {len(report['pairs'])} similar pairs in {len(report['clusters'])} clusters")
+    for cluster in report["clusters"][:10]:
+        print(f"   ↳ {cluster['size']} notes, up to {cluster['max_similarity']:.2f}: {', '.join(cluster['notes'][:8])}")
+    print(f"✅ Report saved to {args.output} ({time.perf_counter() - start:.2f}s)")
@@ -4,8 +4,13 @@ import json
 import time
 import os
 import re
+import argparse
 
-BASE_URL = "https://tafheem.net/islamikitabein/urduref.php"
+from metrics import run_metrics
+from html_archive import HtmlArchive, HtmlDirectory, get_surah_page_url
+
+# Can be pointed at a local mock_server.py instance for offline runs
+BASE_URL = os.environ.get("TAFHEEM_BASE_URL", "https://tafheem.net/islamikitabein/urduref.php")
 
 # Use hardcoded Surah list - can be expanded to full range later
 surah_list = [{'id': str(i), 'name': f'Surah {i}'} for i in range(3, 4)]
@@ -19,7 +24,10 @@ def get_total_verses(surah_id):
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
     }
     try:
-        response = requests.get(url, headers=headers)
+        with run_metrics.stage("fetch_index", surah_id):
+            response = requests.get(url, headers=headers)
+            response.raise_for_status()
+        run_metrics.increment("bytes_fetched", len(response.content), surah_id)
         soup = BeautifulSoup(response.text, 'html.parser')
 
         max_end = 0
@@ -44,23 +52,21 @@ def get_total_verses(surah_id):
         print(f"Error getting total verses for surah {surah_id}: {e}")
         return 0
 
-def download_surah_html(surah_id, total_verses):
+def download_surah_html(surah_id, total_verses, html_dir="html_files", source=None):
     """
-    Download the HTML content for a surah and save to file
+    Download the HTML content for a surah and save it to html_dir,
+    or to source (an HtmlArchive or HtmlDirectory) when given
     """
-    # Create directory if it doesn't exist
-    if not os.path.exists("html_files"):
-        os.makedirs("html_files")
-        
-    # File path for the HTML content
-    html_file_path = f"html_files/surah_{surah_id}_html.txt"
+    if source is None:
+        source = HtmlDirectory(html_dir)
     
-    # If file already exists, skip download
-    if os.path.exists(html_file_path):
-        print(f"   ↳ HTML file for Surah {surah_id} already exists, skipping download")
+    # If the page is already stored, skip download
+    if source.has_surah(surah_id):
+        print(f"   ↳ HTML for Surah {surah_id} already exists, skipping download")
+        run_metrics.increment("cache_hits", 1, surah_id)
         return True
     
-    url = f"{BASE_URL}?sura={surah_id}&verse=1-{total_verses}"
+    url = get_surah_page_url(BASE_URL, surah_id, total_verses)
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
                       "(KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
@@ -68,31 +74,36 @@ def download_surah_html(surah_id, total_verses):
     
     try:
         print(f"   ↳ Downloading Surah {surah_id} content")
-        response = requests.get(url, headers=headers)
+        with run_metrics.stage("fetch", surah_id):
+            response = requests.get(url, headers=headers)
+            # Do not cache error pages as surah content
+            response.raise_for_status()
+        run_metrics.increment("bytes_fetched", len(response.content), surah_id)
         
-        # Save HTML content to file
-        with open(html_file_path, "w", encoding="utf-8") as html_file:
-            html_file.write(response.text)
+        # Save HTML content
+        source.write_surah(surah_id, response.text, url)
         
-        print(f"   ↳ HTML saved to {html_file_path}")
+        print(f"   ↳ HTML for Surah {surah_id} saved")
         return True
     except Exception as e:
         print(f"Error downloading surah {surah_id}: {e}")
         return False
 
-def process_surah_html(surah_id, total_verses):
+def process_surah_html(surah_id, total_verses, source=None):
     """
-    Process the saved HTML file for a surah and extract content
+    Process the saved HTML for a surah and extract content.
+    source is an HtmlArchive or HtmlDirectory, html_files by default.
     """
-    html_file_path = f"html_files/surah_{surah_id}_html.txt"
+    if source is None:
+        source = HtmlDirectory("html_files")
     
-    if not os.path.exists(html_file_path):
-        print(f"   ↳ HTML file for Surah {surah_id} not found")
+    if not source.has_surah(surah_id):
+        print(f"   ↳ HTML for Surah {surah_id} not found")
         return []
     
     try:
-        with open(html_file_path, "r", encoding="utf-8") as html_file:
-            html_content = html_file.read()
+        start = time.perf_counter()
+        html_content = source.read_surah(surah_id)
         
         soup = BeautifulSoup(html_content, 'html.parser')
         content_div = soup.find("div", style="margin:0px auto; max-width:800px; padding:10px;")
@@ -166,9 +177,13 @@ def process_surah_html(surah_id, total_verses):
             }
             verses.append(verse_data)
 
+        run_metrics.record_duration("parse", time.perf_counter() - start, surah_id)
+        run_metrics.increment("verses", len(verses), surah_id)
+        run_metrics.increment("notes", len(tafseer_dict), surah_id)
         return verses
     except Exception as e:
         print(f"Error processing surah {surah_id}: {e}")
+        run_metrics.record_error("parse", surah_id)
         return []
 
 def scrape_tafseer(main_url):
@@ -185,8 +200,10 @@ def scrape_tafseer(main_url):
         
     return complete_tafseer
 
-def main():
+def main(archive_path=None):
     all_surahs = []
+    # One indexed archive file instead of a folder of HTML files
+    source = HtmlArchive(archive_path) if archive_path else HtmlDirectory("html_files")
     
     # First, download all surah HTML files
     for surah in surah_list:
@@ -200,7 +217,7 @@ def main():
             print(f"   ↳ No verses found for Surah {surah_id}, skipping")
             continue
         
-        download_surah_html(surah_id, total_verses)
+        download_surah_html(surah_id, total_verses, source=source)
         time.sleep(1)  # Avoid overloading the server
     
     # Then, process all downloaded HTML files
@@ -213,7 +230,7 @@ def main():
         if total_verses == 0:
             continue
             
-        verses = process_surah_html(surah_id, total_verses)
+        verses = process_surah_html(surah_id, total_verses, source)
         
         if verses:
             all_surahs.append({
@@ -231,6 +248,13 @@ def main():
         json.dump(all_surahs, f, ensure_ascii=False, indent=2)
 
     print("✅ Processing complete. Data saved to tafheem_quran_data.json")
+    source.close()
+    run_metrics.write(name="newap")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Download and parse surah pages from tafheem.net")
+    parser.add_argument("--archive", metavar="PATH",
+                        help="store pages in this single-file archive instead of html_files/")
+    args = parser.parse_args()
+    
+    main(args.archive)
\ No newline at end of file
@@ -0,0 +1,169 @@
+import re
+import sys
+import json
+import time
+import argparse
+
+# Characters dropped from every field: tatweel, zero width (non-)joiners and
+# spaces, byte order marks and the directional marks copied along from the site
+REMOVED_CHARACTERS = "\u0640\u200b\u200c\u200d\u200e\u200f\u202a\u202b\u202c\u202d\u202e\ufeff"
+REMOVAL_TABLE = tuple((character, "") for character in REMOVED_CHARACTERS)
+
+# The site mixes Arabic and Farsi forms of ya, kaf and heh. Urdu fields are
+# brought to the Urdu forms, Arabic fields to the Arabic ones. Only a handful
+# of code points change, so a chain of str.replace calls (each a fast C scan)
+# beats str.translate, which looks up every character in a dict.
+URDU_TABLE = (
+    ("\u064a", "\u06cc"),  # Arabic yeh -> Farsi yeh
+    ("\u0649", "\u06cc"),  # alef maksura -> Farsi yeh
+    ("\u0643", "\u06a9"),  # Arabic kaf -> keheh
+    ("\u0647", "\u06c1"),  # Arabic heh -> heh goal
+)
+ARABIC_TABLE = (
+    ("\u06cc", "\u064a"),  # Farsi yeh -> Arabic yeh (word-final ones are handled first)
+    ("\u06a9", "\u0643"),  # keheh -> Arabic kaf
+    ("\u06c1", "\u0647"),  # heh goal -> Arabic heh
+)
+TABLES = {"arabic": ARABIC_TABLE, "urdu": URDU_TABLE, "tafseer": URDU_TABLE}
+
+# Urdu writes one undotted yeh everywhere, Arabic dots it only inside a word:
+# a word-final Farsi yeh is an alef maksura (علی -> على, not the name علي).
+# "Final" means no letter follows, harakat in between included.
+ARABIC_FINAL_YEH_PATTERN = re.compile(r'\u06cc(?![\u064b-\u065f\u0670]*\w)')
+PATTERNS = {"arabic": ((ARABIC_FINAL_YEH_PATTERN, "\u0649"),)}
+
+# Joins a batch into one string; not whitespace and never present in page text
+BATCH_SEPARATOR = "\x00"
+
+NORMALIZED_SUFFIX = "_normalized"
+
+def apply_table(text, table):
+    for old, new in table:
+        text = text.replace(old, new)
+    return text
+
+def replace_characters(text, kind):
+    """
+    Drop REMOVED_CHARACTERS, then apply the position-dependent patterns of
+    kind and its table. Dropping them first matters: a tatweel is a word
+    character, so in فیـ it would make the final yeh look medial.
+    """
+    text = apply_table(text, REMOVAL_TABLE)
+    for pattern, replacement in PATTERNS.get(kind, ()):
+        text = pattern.sub(replacement, text)
+    return apply_table(text, TABLES[kind])
+
+def collapse_whitespace(text):
+    """
+    Turn every run of whitespace into one space, keeping newlines as tafseer
+    notes are separated by blank lines. str.split() does the work in C,
+    which is several times faster than a whitespace regex here.
+    """
+    return "\n".join(" ".join(line.split()) for line in text.split("\n"))
+
+def normalize_text(text, kind="urdu"):
+    """
+    Normalize a single string. kind is arabic, urdu or tafseer.
+    """
+    return collapse_whitespace(replace_characters(text, kind)).strip()
+
+def normalize_texts(texts, kind="urdu"):
+    """
+    Normalize many strings of one kind with one pass of the replacements
+    and one whitespace split over the whole batch.
+
+    Joining the batch first keeps the per-string call overhead out of the
+    loop, which matters most for many short strings.
+    """
+    if not texts:
+        return []
+    joined = collapse_whitespace(replace_characters(BATCH_SEPARATOR.join(texts), kind))
+    return [text.strip() for text in joined.split(BATCH_SEPARATOR)]
+
+def add_normalized_fields(verses, sources=None):
+    """
+    Add arabic_normalized, urdu_normalized and tafseer_normalized to every verse.
+
+    sources optionally maps a field to the per-verse texts to normalize
+    instead of the raw field, e.g. text extracted with spaces between tags.
+    """
+    sources = sources or {}
+    for field in TABLES:
+        texts = sources.get(field) or [verse.get(field, "") for verse in verses]
+        for verse, normalized in zip(verses, normalize_texts(texts, field)):
+            verse[field + NORMALIZED_SUFFIX] = normalized
+    return verses
+
+def normalize_corpus(surahs):
+    """
+    Add normalized fields to every verse of a list of surahs, one batch per field
+    """
+    all_verses = [verse for surah in surahs for verse in surah["verses"]]
+    add_normalized_fields(all_verses)
+    return surahs
+
+def benchmark(million_characters=1.0):
+    """
+    Time per-string and batched normalization on synthetic verse text and
+    return the seconds per million characters of each
+    """
+    import fixtures
+
+    verses = []
+    surah_number = 1
+    while sum(len(v["urdu"]) for v in verses) < million_characters * 1e6:
+        verses.extend(fixtures.generate_surah_verses(str(surah_number), 286))
+        surah_number += 1
+    texts = [verse["urdu"] for verse in verses]
+    characters = sum(len(text) for text in texts)
+
+    start = time.perf_counter()
+    single = [normalize_text(text) for text in texts]
+    single_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = normalize_texts(texts)
+    batch_seconds = time.perf_counter() - start
+
+    assert single == batched
+    return {
+        "characters": characters,
+        "strings": len(texts),
+        "single_seconds_per_million": single_seconds / characters * 1e6,
+        "batch_seconds_per_million": batch_seconds / characters * 1e6,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add normalized Arabic/Urdu text fields to a surah corpus")
+    parser.add_argument("input", nargs="?", default="all_surahs.json", help="all_surahs.json or a surah_{id}.json")
+    parser.add_argument("-o", "--output", help="where to write the result (default: overwrite input)")
+    parser.add_argument("--benchmark", type=float, metavar="MILLION_CHARS",
+                        help="only measure normalization cost on this many million synthetic characters")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        result = benchmark(args.benchmark)
+        print(f"Normalized {result['characters']} characters in {result['strings']} strings")
+        print(f"   ↳ One string at a time: {result['single_seconds_per_million']:.4f}s per million characters")
+        print(f"   ↳ Batched:              {result['batch_seconds_per_million']:.4f}s per million characters")
+        sys.exit(0)
+
+    with open(args.input, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    # Accept both the full corpus and a single surah file
+    surahs = data if isinstance(data, list) else [data]
+    start = time.perf_counter()
+    normalize_corpus(surahs)
+    seconds = time.perf_counter() - start
+
+    output_path = args.output or args.input
+    if isinstance(data, list):
+        # Keeps the corpus offset index in step with the rewritten file
+        from corpus import write_corpus
+        write_corpus(data, output_path)
+    else:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+    verse_count = sum(len(surah["verses"]) for surah in surahs)
+    print(f"✅ Normalized {verse_count} verses in {seconds:.2f}s, saved to {output_path}")
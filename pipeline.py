@@ -0,0 +1,300 @@
+import os
+import time
+import queue
+import argparse
+import threading
+
+import catalog
+from html_archive import HtmlArchive, HtmlDirectory
+from metrics import run_metrics
+from profiling import SurahProfiler, DEFAULT_PROFILE_DIR
+
+# The stage modules (newap, htmljson, jsonword) pull in requests, bs4 and
+# docx, so each is imported by the stage that needs it. Offline, JSON-only
+# and listing runs never pay for the libraries they do not use. The process
+# pools and the corpus and manifest writers are imported by run_pipeline
+# for the same reason.
+
+# Put on a queue once per worker to tell it the upstream stage is done
+STOP = object()
+
+def parse_surah_ids(value):
+    """
+    Turn "1-3,9,110-114" into ["1", "2", "3", "9", "110", ...]
+    """
+    surah_ids = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        if "-" in item:
+            start, end = item.split("-")
+            surah_ids.extend(str(i) for i in range(int(start), int(end) + 1))
+        else:
+            surah_ids.append(str(int(item)))
+    return surah_ids
+
+def get_json_path(json_dir, surah_id):
+    return os.path.join(json_dir, f"surah_{surah_id}.json")
+
+def fetch_surah(surah_id, source, offline=False, fetch_delay=0.0):
+    """
+    Make sure the surah's HTML is in source (an HtmlArchive or HtmlDirectory),
+    downloading it when missing. Returns the surah id, or None when the surah
+    could not be fetched.
+    """
+    if source.has_surah(surah_id):
+        # Cached pages do not need the verse count lookup either
+        run_metrics.increment("cache_hits", 1, surah_id)
+        return surah_id
+    if offline:
+        print(f"   ↳ HTML for Surah {surah_id} not found, skipping (offline)")
+        return None
+
+    import newap
+
+    print(f"⏳ Fetching Surah {surah_id}")
+    total_verses = newap.get_total_verses(surah_id)
+    if total_verses == 0:
+        print(f"   ↳ No verses found for Surah {surah_id}, skipping")
+        return None
+    if total_verses != catalog.get_verse_count(surah_id):
+        print(f"   ↳ Surah {surah_id} lists {total_verses} verses, catalog has {catalog.get_verse_count(surah_id)}")
+    downloaded = newap.download_surah_html(surah_id, total_verses, source=source)
+    if fetch_delay:
+        time.sleep(fetch_delay)  # Avoid overloading the server
+    return surah_id if downloaded else None
+
+def parse_surah(surah_id, source, json_dir, normalize=False):
+    """
+    Parse a surah page from source and write surah_{id}.json, returning the surah data
+    """
+    import htmljson
+
+    return htmljson.process_surah_to_json(source, surah_id, json_dir, normalize)
+
+def render_surah(json_file_path, word_dir, footnotes=False):
+    import jsonword
+
+    return jsonword.create_quran_word_document(json_file_path, footnotes=footnotes, output_dir=word_dir)
+
+def parse_surah_job(surah_id, html_dir, archive, json_dir, normalize=False):
+    """
+    parse_surah in a pool process. The fetch stage keeps appending to the
+    archive, so each job opens its own read-only view of it.
+    """
+    source = HtmlArchive(archive, read_only=True) if archive else HtmlDirectory(html_dir)
+    try:
+        return parse_surah(surah_id, source, json_dir, normalize)
+    finally:
+        source.close()
+
+def get_surah_id(json_file_path):
+    return os.path.basename(json_file_path).split("_")[1].split(".")[0]
+
+def run_pool_job(profile, surah_id, func, *args):
+    """
+    Run func in a pool process, returning its result and the metrics it
+    recorded. With profile, a (profile_dir, label) pair, the surah is run
+    under a SurahProfiler, which writes its own per-surah files; its
+    results come back too, for the summary.
+    """
+    run_metrics.reset()
+    if not profile:
+        return func(*args), run_metrics.to_report(), []
+    profiler = SurahProfiler(*profile)
+    result = profiler.run(surah_id, func, *args)
+    return result, run_metrics.to_report(), profiler.results
+
+def run_in_pool(pool, profiler, surah_id, func, *args):
+    """
+    Run func in pool and wait for it, merging its metrics into this run's
+    and its profile results into profiler
+    """
+    profile = (profiler.profile_dir, profiler.label) if profiler else None
+    result, report, profile_results = pool.submit(run_pool_job, profile, surah_id, func, *args).result()
+    run_metrics.merge(report)
+    if profiler:
+        profiler.results.extend(profile_results)
+    return result
+
+def list_cached(html_dir="html_files", json_dir="json_files", word_dir="word_files", archive=None):
+    """
+    Print which surahs already have HTML, JSON and DOCX output on disk
+    """
+    outputs = {}
+    if archive and os.path.exists(archive):
+        with HtmlArchive(archive, read_only=True) as html_archive:
+            for surah_id in html_archive.surah_ids():
+                outputs.setdefault(int(surah_id), []).append("html")
+    for label, directory, suffix in (("html", html_dir, "_html.txt"), ("json", json_dir, ".json"),
+                                     ("docx", word_dir, ".docx")):
+        if not os.path.exists(directory) or (label == "html" and archive):
+            continue
+        for filename in os.listdir(directory):
+            if filename.startswith("surah_") and filename.endswith(suffix):
+                surah_id = filename[len("surah_"):-len(suffix)]
+                if surah_id.isdigit():
+                    outputs.setdefault(int(surah_id), []).append(label)
+
+    for surah_number in sorted(outputs):
+        print(f"Surah {surah_number}: {' '.join(outputs[surah_number])}")
+    for label in ("html", "json", "docx"):
+        count = sum(1 for labels in outputs.values() if label in labels)
+        print(f"{label:<4} {count}/{catalog.TOTAL_SURAHS}")
+    return outputs
+
+def stage_worker(name, func, in_queue, out_queue):
+    """
+    Pull items from in_queue until STOP, passing every result on to out_queue.
+    A full out_queue blocks the worker, which is what holds back a stage that
+    runs ahead of the next one.
+    """
+    while True:
+        item = in_queue.get()
+        if item is STOP:
+            break
+        try:
+            result = func(item)
+        except Exception as e:
+            print(f"Error in {name} stage for {item}: {e}")
+            run_metrics.record_error(name)
+            continue
+        if result is not None and out_queue is not None:
+            out_queue.put(result)
+
+def start_stage(name, func, in_queue, out_queue, workers):
+    threads = []
+    for i in range(workers):
+        thread = threading.Thread(target=stage_worker, args=(name, func, in_queue, out_queue),
+                                  name=f"{name}-{i + 1}", daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads
+
+def finish_stage(threads, in_queue):
+    """
+    Tell every worker of a stage to stop once its queue drains, then wait for them
+    """
+    for _ in threads:
+        in_queue.put(STOP)
+    for thread in threads:
+        thread.join()
+
+def run_pipeline(surah_ids, html_dir="html_files", json_dir="json_files", word_dir="word_files",
+                 fetch_workers=4, parse_workers=2, docx_workers=2, queue_size=4,
+                 offline=False, docx=True, footnotes=False, fetch_delay=0.0, normalize=False, archive=None,
+                 profile_dir=None):
+    """
+    Run fetch -> parse -> JSON -> DOCX over the surahs with every stage
+    working at the same time, so early surahs are being rendered while
+    later ones are still downloading.
+
+    Stages are connected by queues holding at most queue_size surahs.
+    Fetch workers are threads, as fetching waits on the network. Parsing
+    (BeautifulSoup) and rendering (python-docx) are CPU-bound and would
+    gain nothing from threads, so each of their workers is a thread that
+    takes a surah off its queue and hands it to a process pool of the same
+    size. A full queue still holds back the stage before it.
+
+    With archive, pages are kept in that single .tafr file instead of html_dir.
+    With profile_dir, every surah is parsed and rendered under a
+    SurahProfiler, and each stage writes its summary there at the end.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from changes import write_manifest, MANIFEST_FILENAME
+    from corpus import write_corpus
+
+    for directory in (json_dir, word_dir) if archive else (html_dir, json_dir, word_dir):
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+    source = HtmlArchive(archive) if archive else HtmlDirectory(html_dir)
+
+    all_surahs_data = {}
+    data_lock = threading.Lock()
+
+    def fetch(surah_id):
+        return fetch_surah(surah_id, source, offline, fetch_delay)
+
+    # Spawned rather than forked, as the fetch threads are already running
+    process_context = multiprocessing.get_context("spawn")
+    parse_pool = ProcessPoolExecutor(parse_workers, mp_context=process_context)
+    docx_pool = ProcessPoolExecutor(docx_workers, mp_context=process_context) if docx else None
+    parse_profiler = SurahProfiler(profile_dir, label="parse") if profile_dir else None
+    docx_profiler = SurahProfiler(profile_dir, label="docx") if profile_dir and docx else None
+
+    def parse(surah_id):
+        surah_data = run_in_pool(parse_pool, parse_profiler, surah_id, parse_surah_job, surah_id, html_dir, archive, json_dir, normalize)
+        if not surah_data:
+            return None
+        with data_lock:
+            all_surahs_data[surah_data["surah_id"]] = surah_data
+        return get_json_path(json_dir, surah_data["surah_id"])
+
+    def render(json_file_path):
+        return run_in_pool(docx_pool, docx_profiler, get_surah_id(json_file_path),
+                           render_surah, json_file_path, word_dir, footnotes)
+
+    fetch_queue = queue.Queue()
+    parse_queue = queue.Queue(maxsize=queue_size)
+    docx_queue = queue.Queue(maxsize=queue_size) if docx else None
+
+    fetch_threads = start_stage("fetch", fetch, fetch_queue, parse_queue, fetch_workers)
+    parse_threads = start_stage("parse", parse, parse_queue, docx_queue, parse_workers)
+    docx_threads = start_stage("docx", render, docx_queue, None, docx_workers) if docx else []
+
+    for surah_id in surah_ids:
+        fetch_queue.put(surah_id)
+
+    # Shut the stages down front to back so nothing is left in a queue
+    finish_stage(fetch_threads, fetch_queue)
+    finish_stage(parse_threads, parse_queue)
+    parse_pool.shutdown()
+    if docx:
+        finish_stage(docx_threads, docx_queue)
+        docx_pool.shutdown()
+    source.close()
+
+    # Also save a complete collection in one file, in surah order
+    all_surahs = [all_surahs_data[surah_id] for surah_id in sorted(all_surahs_data, key=int)]
+    write_corpus(all_surahs, os.path.join(json_dir, "all_surahs.json"))
+    write_manifest(all_surahs, os.path.join(json_dir, MANIFEST_FILENAME))
+
+    for profiler in (parse_profiler, docx_profiler):
+        if profiler:
+            profiler.write_summary()
+
+    print(f"✅ Pipeline complete. Processed {len(all_surahs)}/{len(surah_ids)} surahs")
+    return all_surahs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch, parse and export surahs as one overlapping pipeline")
+    parser.add_argument("--surahs", default=f"1-{catalog.TOTAL_SURAHS}", help="e.g. 1-114 or 2,3,110-114")
+    parser.add_argument("--html-dir", default="html_files")
+    parser.add_argument("--json-dir", default="json_files")
+    parser.add_argument("--word-dir", default="word_files")
+    parser.add_argument("--fetch-workers", type=int, default=4)
+    parser.add_argument("--parse-workers", type=int, default=2, help="processes parsing HTML into JSON")
+    parser.add_argument("--docx-workers", type=int, default=2, help="processes rendering DOCX files")
+    parser.add_argument("--queue-size", type=int, default=4, help="surahs allowed to wait between two stages")
+    parser.add_argument("--fetch-delay", type=float, default=1.0, help="seconds each fetch worker waits after a download")
+    parser.add_argument("--archive", metavar="PATH", help="keep pages in this single-file archive instead of --html-dir")
+    parser.add_argument("--offline", action="store_true", help="only use HTML already in --html-dir or --archive")
+    parser.add_argument("--no-docx", action="store_true", help="stop after writing JSON")
+    parser.add_argument("--footnotes", action="store_true", help="render tafseer notes as Word footnotes")
+    parser.add_argument("--normalize", action="store_true", help="add normalized text fields to the JSON")
+    parser.add_argument("--profile", nargs="?", const=DEFAULT_PROFILE_DIR, metavar="DIR",
+                        help=f"profile every surah's parse and render and write the results to DIR (default: {DEFAULT_PROFILE_DIR})")
+    parser.add_argument("--list-cached", action="store_true", help="list the surahs already on disk and exit")
+    args = parser.parse_args()
+
+    if args.list_cached:
+        list_cached(args.html_dir, args.json_dir, args.word_dir, args.archive)
+        raise SystemExit(0)
+
+    run_pipeline(parse_surah_ids(args.surahs), args.html_dir, args.json_dir, args.word_dir,
+                 args.fetch_workers, args.parse_workers, args.docx_workers, args.queue_size,
+                 args.offline, not args.no_docx, args.footnotes, args.fetch_delay, args.normalize, args.archive,
+                 args.profile)
+    run_metrics.write(name="pipeline")
@@ -0,0 +1,100 @@
+import os
+import io
+import json
+import time
+
+DEFAULT_PROFILE_DIR = "profiles"
+
+# cProfile, pstats and tracemalloc are imported by the methods that use them,
+# so entry points can offer --profile without paying for them on every run
+
+class SurahProfiler:
+    """
+    Run each surah's work under cProfile and tracemalloc.
+
+    For every surah it writes into profile_dir:
+    - surah_{id}_{label}.prof: raw cProfile stats, for snakeviz or pstats
+    - surah_{id}_{label}_cpu.txt: the functions with the most cumulative time
+    - surah_{id}_{label}_memory.txt: the lines that allocated the most memory
+    write_summary() then ranks the slowest and most memory-hungry surahs.
+    """
+    def __init__(self, profile_dir=DEFAULT_PROFILE_DIR, label="run", top=25):
+        self.profile_dir = profile_dir
+        self.label = label
+        self.top = top
+        self.results = []
+        if not os.path.exists(profile_dir):
+            os.makedirs(profile_dir)
+
+    def run(self, surah_id, func, *args, **kwargs):
+        """
+        Call func(*args, **kwargs) for a surah under both profilers and return its result
+        """
+        import cProfile
+        import tracemalloc
+
+        profile = cProfile.Profile()
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            result = profile.runcall(func, *args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.save(surah_id, profile, snapshot, seconds, peak)
+        return result
+
+    def save(self, surah_id, profile, snapshot, seconds, peak):
+        import pstats
+        import cProfile
+        import tracemalloc
+
+        base_path = os.path.join(self.profile_dir, f"surah_{surah_id}_{self.label}")
+        profile.dump_stats(base_path + ".prof")
+
+        cpu_report = io.StringIO()
+        stats = pstats.Stats(profile, stream=cpu_report)
+        stats.sort_stats("cumulative").print_stats(self.top)
+        with open(base_path + "_cpu.txt", "w", encoding="utf-8") as f:
+            f.write(cpu_report.getvalue())
+
+        # Leave the profilers' own allocations out of the memory report
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, cProfile.__file__),
+        ])
+        top_allocations = snapshot.statistics("lineno")[:self.top]
+        with open(base_path + "_memory.txt", "w", encoding="utf-8") as f:
+            f.write(f"Peak traced memory: {peak / 1e6:.2f} MB\n\n")
+            for stat in top_allocations:
+                f.write(f"{stat}\n")
+
+        self.results.append({
+            "surah_id": str(surah_id),
+            "seconds": seconds,
+            "peak_memory_bytes": peak,
+            "function_calls": stats.total_calls,
+            "top_allocation": str(top_allocations[0]) if top_allocations else "",
+        })
+
+    def write_summary(self, count=10):
+        """
+        Write the surah ranking to summary_{label}.json and print the top entries
+        """
+        slowest = sorted(self.results, key=lambda r: r["seconds"], reverse=True)
+        largest = sorted(self.results, key=lambda r: r["peak_memory_bytes"], reverse=True)
+
+        summary_path = os.path.join(self.profile_dir, f"summary_{self.label}.json")
+        with open(summary_path, "w", encoding="utf-8") as f:
+            json.dump({"slowest": slowest, "largest": largest}, f, indent=2)
+
+        print(f"\n⏳ Slowest surahs ({self.label})")
+        for r in slowest[:count]:
+            print(f"   ↳ Surah {r['surah_id']}: {r['seconds']:.3f}s, {r['function_calls']} calls")
+        print(f"⏳ Largest surahs by peak memory ({self.label})")
+        for r in largest[:count]:
+            print(f"   ↳ Surah {r['surah_id']}: {r['peak_memory_bytes'] / 1e6:.2f} MB")
+        print(f"✅ Profiles saved to {self.profile_dir}, summary in {summary_path}")
+        return summary_path
@@ -0,0 +1,348 @@
+import os
+import time
+import socket
+import sqlite3
+import argparse
+import threading
+import multiprocessing
+
+import catalog
+import pipeline
+from html_archive import HtmlDirectory
+from metrics import run_metrics
+
+# Each surah goes through these jobs in order, completing one queues the next
+JOB_STAGES = ["download", "parse", "render"]
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    surah_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    last_error TEXT,
+    updated_at REAL,
+    UNIQUE (surah_id, stage)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, stage);
+"""
+
+class WorkQueue:
+    """
+    Lease-based job queue kept in a SQLite file on shared storage.
+
+    A worker claims a job by taking a lease on it and keeps the lease alive
+    with heartbeats. When a worker dies its lease runs out and the next
+    claim picks the job up again, until max_attempts is used up.
+    """
+    def __init__(self, db_path, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # Autocommit mode, transactions are opened explicitly with BEGIN IMMEDIATE
+        self.connection = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def transaction(self):
+        """
+        Take the database write lock up front so two workers never claim the same job
+        """
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def enqueue(self, surah_ids, stage=JOB_STAGES[0]):
+        """
+        Add a job per surah, leaving surahs that already have one untouched
+        """
+        now = time.time()
+        connection = self.transaction()
+        try:
+            cursor = connection.executemany(
+                "INSERT OR IGNORE INTO jobs (surah_id, stage, updated_at) VALUES (?, ?, ?)",
+                [(str(surah_id), stage, now) for surah_id in surah_ids],
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return cursor.rowcount
+
+    def claim(self, worker_id, stages=JOB_STAGES):
+        """
+        Lease the next available job for worker_id, or return None.
+        Later stages go first so surahs finish before new ones are started.
+        """
+        now = time.time()
+        stage_placeholders = ",".join("?" for _ in stages)
+        stage_order = " ".join(f"WHEN '{stage}' THEN {i}" for i, stage in enumerate(reversed(JOB_STAGES)))
+
+        connection = self.transaction()
+        try:
+            # Jobs whose lease ran out too many times are given up on
+            connection.execute(
+                "UPDATE jobs SET status = 'failed', last_error = 'lease expired', lease_owner = NULL, updated_at = ? "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts),
+            )
+            row = connection.execute(
+                f"SELECT id, surah_id, stage, attempts FROM jobs "
+                f"WHERE stage IN ({stage_placeholders}) "
+                f"AND (status = 'pending' OR (status = 'leased' AND lease_expires < ?)) "
+                f"ORDER BY CASE stage {stage_order} END, CAST(surah_id AS INTEGER) LIMIT 1",
+                (*stages, now),
+            ).fetchone()
+            if row:
+                connection.execute(
+                    "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                    "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (worker_id, now + self.lease_seconds, now, row[0]),
+                )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+        if not row:
+            return None
+        return {"id": row[0], "surah_id": row[1], "stage": row[2], "attempts": row[3] + 1}
+
+    def heartbeat(self, job, worker_id):
+        """
+        Extend the lease, returning False if the job was taken over by another worker
+        """
+        now = time.time()
+        cursor = self.connection.execute(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (now + self.lease_seconds, now, job["id"], worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job, worker_id):
+        """
+        Mark the job done and queue the surah's next stage
+        """
+        now = time.time()
+        connection = self.transaction()
+        try:
+            cursor = connection.execute(
+                "UPDATE jobs SET status = 'done', lease_owner = NULL, lease_expires = NULL, "
+                "last_error = NULL, updated_at = ? WHERE id = ? AND lease_owner = ?",
+                (now, job["id"], worker_id),
+            )
+            completed = cursor.rowcount == 1
+            stage_index = JOB_STAGES.index(job["stage"])
+            if completed and stage_index + 1 < len(JOB_STAGES):
+                connection.execute(
+                    "INSERT OR IGNORE INTO jobs (surah_id, stage, updated_at) VALUES (?, ?, ?)",
+                    (job["surah_id"], JOB_STAGES[stage_index + 1], now),
+                )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return completed
+
+    def fail(self, job, worker_id, error):
+        """
+        Release a failed job for another try, or mark it failed after max_attempts
+        """
+        status = "failed" if job["attempts"] >= self.max_attempts else "pending"
+        self.connection.execute(
+            "UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires = NULL, last_error = ?, updated_at = ? "
+            "WHERE id = ? AND lease_owner = ?",
+            (status, str(error)[:1000], time.time(), job["id"], worker_id),
+        )
+        return status
+
+    def requeue(self, statuses=("failed",)):
+        """
+        Put failed (and optionally other) jobs back to pending with fresh attempts
+        """
+        placeholders = ",".join("?" for _ in statuses)
+        cursor = self.connection.execute(
+            f"UPDATE jobs SET status = 'pending', attempts = 0, lease_owner = NULL, lease_expires = NULL, "
+            f"updated_at = ? WHERE status IN ({placeholders})",
+            (time.time(), *statuses),
+        )
+        return cursor.rowcount
+
+    def has_open_jobs(self):
+        row = self.connection.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'leased')"
+        ).fetchone()
+        return row[0] > 0
+
+    def get_status(self):
+        """
+        Return {stage: {status: count}} plus the failed jobs' errors
+        """
+        counts = {}
+        for stage, status, count in self.connection.execute(
+            "SELECT stage, status, COUNT(*) FROM jobs GROUP BY stage, status"
+        ):
+            counts.setdefault(stage, {})[status] = count
+        failed = self.connection.execute(
+            "SELECT surah_id, stage, attempts, last_error FROM jobs WHERE status = 'failed' "
+            "ORDER BY CAST(surah_id AS INTEGER)"
+        ).fetchall()
+        return counts, failed
+
+def run_job(job, html_dir, json_dir, word_dir, footnotes=False, fetch_delay=0.0):
+    """
+    Run one surah job with the same stage functions as pipeline.py.
+    Pages stay loose files in html_dir: an archive has a single writer,
+    and workers may run on several machines.
+    """
+    surah_id = job["surah_id"]
+    source = HtmlDirectory(html_dir)
+    if job["stage"] == "download":
+        if not pipeline.fetch_surah(surah_id, source, fetch_delay=fetch_delay):
+            raise RuntimeError(f"could not download surah {surah_id}")
+    elif job["stage"] == "parse":
+        if not pipeline.parse_surah(surah_id, source, json_dir):
+            raise RuntimeError(f"could not parse surah {surah_id}")
+    elif job["stage"] == "render":
+        pipeline.render_surah(pipeline.get_json_path(json_dir, surah_id), word_dir, footnotes)
+    else:
+        raise ValueError(f"Unknown job stage: {job['stage']}")
+
+def keep_lease_alive(db_path, lease_seconds, job, worker_id, stop_event):
+    """
+    Heartbeat thread body, renewing the lease every third of its length
+    """
+    work_queue = WorkQueue(db_path, lease_seconds)
+    try:
+        while not stop_event.wait(lease_seconds / 3):
+            if not work_queue.heartbeat(job, worker_id):
+                print(f"   ↳ Lost lease on surah {job['surah_id']} {job['stage']}")
+                break
+    finally:
+        work_queue.close()
+
+def run_worker(db_path, html_dir="html_files", json_dir="json_files", word_dir="word_files",
+               stages=JOB_STAGES, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS,
+               poll_interval=5.0, exit_when_empty=True, footnotes=False, fetch_delay=0.0):
+    """
+    Claim and run jobs until the queue is empty (or forever with exit_when_empty=False)
+    """
+    # Several workers may start at once, so do not fail if another one made the folder
+    for directory in (html_dir, json_dir, word_dir):
+        os.makedirs(directory, exist_ok=True)
+
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    work_queue = WorkQueue(db_path, lease_seconds, max_attempts)
+    jobs_done = 0
+    print(f"⏳ Worker {worker_id} started on {', '.join(stages)}")
+
+    try:
+        while True:
+            job = work_queue.claim(worker_id, stages)
+            if not job:
+                if exit_when_empty and not work_queue.has_open_jobs():
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            print(f"⏳ [{worker_id}] Surah {job['surah_id']} {job['stage']} (attempt {job['attempts']})")
+            stop_event = threading.Event()
+            heartbeat = threading.Thread(target=keep_lease_alive, daemon=True,
+                                         args=(db_path, lease_seconds, job, worker_id, stop_event))
+            heartbeat.start()
+            try:
+                run_job(job, html_dir, json_dir, word_dir, footnotes, fetch_delay)
+            except Exception as e:
+                stop_event.set()
+                status = work_queue.fail(job, worker_id, e)
+                run_metrics.record_error(job["stage"], job["surah_id"])
+                print(f"Error in surah {job['surah_id']} {job['stage']}: {e} ({status})")
+            else:
+                stop_event.set()
+                if work_queue.complete(job, worker_id):
+                    jobs_done += 1
+            heartbeat.join()
+    finally:
+        work_queue.close()
+
+    print(f"✅ Worker {worker_id} finished, completed {jobs_done} jobs")
+    run_metrics.write(name=f"worker_{socket.gethostname()}_{os.getpid()}")
+    return jobs_done
+
+def print_status(db_path):
+    work_queue = WorkQueue(db_path)
+    try:
+        counts, failed = work_queue.get_status()
+    finally:
+        work_queue.close()
+
+    for stage in JOB_STAGES:
+        stage_counts = counts.get(stage, {})
+        summary = ", ".join(f"{status}: {count}" for status, count in sorted(stage_counts.items()))
+        print(f"{stage:<9} {summary or 'no jobs'}")
+    for surah_id, stage, attempts, last_error in failed:
+        print(f"❌ Surah {surah_id} {stage} failed after {attempts} attempts: {last_error}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shard surah downloads and exports over workers sharing a SQLite queue")
+    parser.add_argument("--db", default="work_queue.db", help="queue database, on storage shared by all workers")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue_parser = commands.add_parser("enqueue", help="queue surahs for download, parse and render")
+    enqueue_parser.add_argument("--surahs", default=f"1-{catalog.TOTAL_SURAHS}", help="e.g. 1-114 or 2,3,110-114")
+    enqueue_parser.add_argument("--stage", choices=JOB_STAGES, default=JOB_STAGES[0],
+                                help="stage to start from, e.g. parse when the HTML is already on disk")
+
+    worker_parser = commands.add_parser("worker", help="claim and run jobs")
+    worker_parser.add_argument("--processes", type=int, default=1, help="worker processes to start on this machine")
+    worker_parser.add_argument("--stages", default=",".join(JOB_STAGES), help="only run these job stages")
+    worker_parser.add_argument("--html-dir", default="html_files")
+    worker_parser.add_argument("--json-dir", default="json_files")
+    worker_parser.add_argument("--word-dir", default="word_files")
+    worker_parser.add_argument("--lease-seconds", type=float, default=DEFAULT_LEASE_SECONDS)
+    worker_parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS)
+    worker_parser.add_argument("--poll-interval", type=float, default=5.0)
+    worker_parser.add_argument("--forever", action="store_true", help="keep polling when the queue is empty")
+    worker_parser.add_argument("--fetch-delay", type=float, default=1.0)
+    worker_parser.add_argument("--footnotes", action="store_true")
+
+    commands.add_parser("status", help="show job counts per stage and failed jobs")
+
+    requeue_parser = commands.add_parser("requeue", help="retry failed jobs")
+    requeue_parser.add_argument("--include-leased", action="store_true",
+                                help="also release leased jobs, e.g. after every worker was killed")
+
+    args = parser.parse_args()
+
+    if args.command == "enqueue":
+        work_queue = WorkQueue(args.db)
+        added = work_queue.enqueue(pipeline.parse_surah_ids(args.surahs), args.stage)
+        work_queue.close()
+        print(f"✅ Queued {added} {args.stage} jobs in {args.db}")
+    elif args.command == "worker":
+        worker_args = (args.db, args.html_dir, args.json_dir, args.word_dir,
+                       [stage.strip() for stage in args.stages.split(",") if stage.strip()],
+                       args.lease_seconds, args.max_attempts, args.poll_interval,
+                       not args.forever, args.footnotes, args.fetch_delay)
+        if args.processes == 1:
+            run_worker(*worker_args)
+        else:
+            processes = [multiprocessing.Process(target=run_worker, args=worker_args) for _ in range(args.processes)]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+    elif args.command == "status":
+        print_status(args.db)
+    elif args.command == "requeue":
+        work_queue = WorkQueue(args.db)
+        count = work_queue.requeue(("failed", "leased") if args.include_leased else ("failed",))
+        work_queue.close()
+        print(f"✅ Requeued {count} jobs")